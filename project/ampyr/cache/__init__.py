@@ -1,4 +1,14 @@
 from ampyr.cache.managers import \
-    NullCacheManager, MemoryCacheManager, FileCacheManager, \
-    ShelfCacheManager
-from ampyr.cache.tools import cachemethod
+    ObjectMode, NullCacheManager, MemoryCacheManager, FileCacheManager, \
+    LockedFileCacheManager, ShelfCacheManager, LogCacheManager, \
+    SQLiteCacheManager, SnapshotCacheManager, TieredCacheManager, \
+    ShardedMemoryCacheManager, SharedMemoryCacheManager, HashRingCacheManager, \
+    WriteBehindCacheManager
+from ampyr.cache.managers import \
+    AsyncMemoryCacheManager, AsyncFileCacheManager, AsyncLogCacheManager, \
+    AsyncSQLiteCacheManager, AsyncShelfCacheManager
+from ampyr.cache.policies import \
+    ARCPolicy, LFUPolicy, LRUPolicy, TinyLFUPolicy, replay
+from ampyr.cache.remote import CacheServer, RemoteCacheManager
+from ampyr.cache.stats import CacheStats
+from ampyr.cache.tools import MISSING, RefreshPool, cachemethod, write_snapshot
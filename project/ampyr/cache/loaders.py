@@ -3,8 +3,48 @@ Defines behavior of brokering raw data into/from
 Python objects.
 """
 
+import abc, pickle, struct, zlib
+
 from ampyr import factories as ft, protocols as pt, typedefs as td
 
+try:
+    import lzma
+except ImportError:
+    lzma = None  #type: ignore[assignment]
+
+HEADER_MAGIC = b"\xa7\xcf"
+"""
+Leading bytes of data dumped by a `TaggedLoader`.
+"""
+
+HEADER = struct.Struct(">2sBB")
+"""
+Header of data dumped by a `TaggedLoader`. Holds
+the magic bytes, the format and the compression
+codec.
+"""
+
+FORMAT_PICKLE = 1
+"""Format identifier of `PickleLoader` data."""
+
+FORMAT_BINARY = 2
+"""Format identifier of `BinaryLoader` data."""
+
+CODEC_NONE = 0
+"""Codec identifier of uncompressed data."""
+
+CODEC_ZLIB = 1
+"""Codec identifier of `zlib` compressed data."""
+
+CODEC_LZMA = 2
+"""Codec identifier of `lzma` compressed data."""
+
+DEFAULT_COMPRESS_THRESHOLD = 1024
+"""
+Default size, in bytes, from which dumped data is
+compressed.
+"""
+
 
 class NullLoader(pt.SupportsSerialize[td.GT]):
     """
@@ -20,19 +60,265 @@ class NullLoader(pt.SupportsSerialize[td.GT]):
         return data
 
 
+class TaggedLoader(pt.SupportsSerialize[td.GT], abc.ABC):
+    """
+    Dumps data as bytes prefixed with a small
+    header naming its format and compression, so
+    it can be loaded by any other `TaggedLoader`.
+
+    WARNING: not meant to be used directly!
+    """
+
+    format_id: int
+    """Identifier written to the header."""
+
+    compression: td.OptString
+    """
+    Name of the codec used to compress dumped
+    data. Either 'zlib', 'lzma' or `None`.
+    """
+
+    threshold: int
+    """
+    Size, in bytes, from which dumped data is
+    compressed.
+    """
+
+    def __init__(self,
+                 *,
+                 compression: td.OptString = None,
+                 threshold: int = DEFAULT_COMPRESS_THRESHOLD):
+
+        if compression not in (None, *_CODEC_IDS):
+            raise ValueError(f"unsupported compression {compression!r}.")
+
+        self.compression = compression
+        self.threshold = threshold
+
+    @abc.abstractmethod
+    def encode(self, data: td.GT) -> bytes:
+        """Converts some Python object to bytes."""
+
+    def loads(self, data, *args, **kwds):
+        return decode(data)
+
+    def dumps(self, data, *args, **kwds):
+        raw, codec = self.encode(data), CODEC_NONE
+
+        if self.compression and len(raw) >= self.threshold:
+            codec = _CODEC_IDS[self.compression]
+            packed = _CODECS[codec][0](raw)
+
+            # Only keep the compressed data if it
+            # is worth it.
+            if len(packed) < len(raw):
+                raw = packed
+            else:
+                codec = CODEC_NONE
+
+        return HEADER.pack(HEADER_MAGIC, self.format_id, codec) + raw
+
+
+class PickleLoader(TaggedLoader[td.GT]):
+    """
+    Dumps data with `pickle`. Only load data from
+    trusted caches.
+    """
+
+    format_id = FORMAT_PICKLE
+
+    protocol: int
+    """`pickle` protocol used to dump data."""
+
+    def __init__(self,
+                 protocol: int = 5,
+                 *,
+                 compression: td.OptString = None,
+                 threshold: int = DEFAULT_COMPRESS_THRESHOLD):
+
+        super().__init__(compression=compression, threshold=threshold)
+        self.protocol = protocol
+
+    def encode(self, data):
+        return pickle.dumps(data, protocol=self.protocol)
+
+
+class BinaryLoader(TaggedLoader[td.GT]):
+    """
+    Dumps data in a compact tagged binary format.
+    Supports `None`, booleans, integers, floats,
+    strings, bytes, lists, tuples and dicts.
+    Tuples are loaded back as lists.
+    """
+
+    format_id = FORMAT_BINARY
+
+    def encode(self, data):
+        buffer = bytearray()
+        _encode_binary(data, buffer)
+        return bytes(buffer)
+
+
+def istagged(data) -> bool:
+    """
+    Whether some raw data was dumped by a
+    `TaggedLoader`.
+    """
+
+    return isinstance(data, (bytes, bytearray)) and \
+        data[:len(HEADER_MAGIC)] == HEADER_MAGIC
+
+
+def decode(data: bytes):
+    """
+    Loads data dumped by any `TaggedLoader`,
+    detecting its format and compression from the
+    header.
+    """
+
+    _, format_id, codec = HEADER.unpack_from(data)
+    raw = bytes(data[HEADER.size:])
+
+    if codec != CODEC_NONE:
+        if codec not in _CODECS:
+            raise ValueError(f"unsupported codec {codec}.")
+        raw = _CODECS[codec][1](raw)
+
+    if format_id == FORMAT_PICKLE:
+        return pickle.loads(raw)
+    if format_id == FORMAT_BINARY:
+        found, _ = _decode_binary(raw, 0)
+        return found
+    raise ValueError(f"unsupported format {format_id}.")
+
+
+def _encode_varint(value: int, buffer: bytearray):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _decode_varint(raw: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = raw[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def _encode_binary(data, buffer: bytearray):
+    if data is None:
+        buffer += b"N"
+    elif data is True:
+        buffer += b"T"
+    elif data is False:
+        buffer += b"F"
+    elif isinstance(data, int):
+        # Zigzag encoding keeps small negative
+        # numbers small.
+        buffer += b"I"
+        _encode_varint(data << 1 if data >= 0 else (~data << 1) | 1, buffer)
+    elif isinstance(data, float):
+        buffer += b"D" + _FLOAT.pack(data)
+    elif isinstance(data, str):
+        raw = data.encode()
+        buffer += b"S"
+        _encode_varint(len(raw), buffer)
+        buffer += raw
+    elif isinstance(data, (bytes, bytearray)):
+        buffer += b"B"
+        _encode_varint(len(data), buffer)
+        buffer += data
+    elif isinstance(data, (list, tuple)):
+        buffer += b"L"
+        _encode_varint(len(data), buffer)
+        for item in data:
+            _encode_binary(item, buffer)
+    elif isinstance(data, dict):
+        buffer += b"M"
+        _encode_varint(len(data), buffer)
+        for key, item in data.items():
+            _encode_binary(key, buffer)
+            _encode_binary(item, buffer)
+    else:
+        raise TypeError(f"cannot encode {type(data).__name__!r} objects.")
+
+
+def _decode_binary(raw: bytes, offset: int):
+    tag, offset = raw[offset:offset + 1], offset + 1
+
+    if tag in _CONSTANTS:
+        return _CONSTANTS[tag], offset
+    if tag == b"I":
+        value, offset = _decode_varint(raw, offset)
+        return (value >> 1) ^ -(value & 1), offset
+    if tag == b"D":
+        return _FLOAT.unpack_from(raw, offset)[0], offset + _FLOAT.size
+    if tag in (b"S", b"B"):
+        size, offset = _decode_varint(raw, offset)
+        found = raw[offset:offset + size]
+        return (found.decode() if tag == b"S" else found), offset + size
+    if tag == b"L":
+        size, offset = _decode_varint(raw, offset)
+        items = []
+        for _ in range(size):
+            item, offset = _decode_binary(raw, offset)
+            items.append(item)
+        return items, offset
+    if tag == b"M":
+        size, offset = _decode_varint(raw, offset)
+        mapping = {}
+        for _ in range(size):
+            key, offset = _decode_binary(raw, offset)
+            mapping[key], offset = _decode_binary(raw, offset)
+        return mapping, offset
+
+    raise ValueError(f"unknown tag {tag!r} at offset {offset - 1}.")
+
+
+_CONSTANTS = {b"N": None, b"T": True, b"F": False}
+_FLOAT = struct.Struct(">d")
+
+_CODECS: dict[int, tuple[ft.Callable[[bytes], bytes],
+                         ft.Callable[[bytes], bytes]]] = {
+                             CODEC_ZLIB: (zlib.compress, zlib.decompress),
+                         }
+_CODEC_IDS = {"zlib": CODEC_ZLIB}
+
+if lzma is not None:
+    _CODECS[CODEC_LZMA] = (lzma.compress, lzma.decompress)
+    _CODEC_IDS["lzma"] = CODEC_LZMA
+
+
 def load(serializer: pt.SupportsSerialize[td.GT],
          data: td.StrOrBytes,
          *,
+         detect: bool = False,
          factory: ft.OptGenericFT[td.GT] = None) -> td.GT:
     """
     Loads raw `data` using some `serializer`.
 
     factory option allows for post-serialization
     manipulation of the data/object.
+
+    A `TaggedLoader` detects the format of data
+    from its header. Given `detect=True`, data
+    dumped by a `BinaryLoader` is detected
+    whatever the `serializer`. Pickled data is
+    only loaded by a `TaggedLoader`.
     """
 
     if not factory:
         factory = ft.basic_passthrough_ft
+
+    binary = detect and istagged(data) \
+        and data[len(HEADER_MAGIC)] == FORMAT_BINARY
+    if binary or isinstance(serializer, TaggedLoader) and istagged(data):
+        return factory(decode(data))  #type: ignore[arg-type]
     return factory(serializer.loads(data))  #type: ignore[type-var]
 
 
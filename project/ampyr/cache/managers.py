@@ -4,10 +4,18 @@ classes as handlers for brokering data to/from
 some cache.
 """
 
-import json, os, shelve
+import asyncio, atexit, bisect, collections, contextlib, copy, enum, importlib
+import json, mmap, os, shelve, sqlite3, struct, tempfile, threading, time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  #type: ignore[assignment]
 
 from ampyr import protocols as pt, typedefs as td
-from ampyr.cache import loaders, tools
+from ampyr.cache import loaders, policies, sketches, stats, tools
 
 
 class SimpleCacheManager(pt.CacheManager[td.GT]):
@@ -31,6 +39,26 @@ class SimpleCacheManager(pt.CacheManager[td.GT]):
     with this `CacheManager`.
     """
 
+    stats: stats.CacheStats
+    """
+    Counts the transactions of this
+    `CacheManager`.
+    """
+
+    tags: tools.TagIndex
+    """
+    Links the tags entries were saved with to
+    their keys.
+    """
+
+    tags_location: td.Optional[str] = None
+    """
+    Path to the database `tags` are kept in, so
+    they outlive this manager and are shared by
+    every manager of the same data. `None` keeps
+    them in memory only.
+    """
+
     def __init__(self,
                  *,
                  serializer: td.Optional[pt.SupportsSerialize] = None,
@@ -41,6 +69,92 @@ class SimpleCacheManager(pt.CacheManager[td.GT]):
                            or loaders.NullLoader())
 
         self.sub_ids = sub_ids or ()
+        self.stats = stats.CacheStats()
+        self.tags = tools.TagIndex()
+
+    def invalidate(self, key: str):
+        """Drops some entry, and unlinks its tags."""
+
+        self.invalidate_many((key, ))
+
+    def invalidate_many(self, keys: td.Iterable[str]):
+        """Drops some entries, and unlinks their tags."""
+
+        keys = list(keys)
+        self._untag(keys)
+        self._remove(keys)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """
+        Drops every entry saved with some tag.
+        Returns the number of keys dropped.
+        """
+
+        keys = self._tagged(tag)
+        if keys:
+            self._remove(list(keys))
+        return len(keys)
+
+    def _dump(self, data: td.GT) -> td.StrOrBytes:
+        """
+        Serializes some data, counting its size in
+        `stats`.
+        """
+
+        dump = loaders.dump(self.serializer, data)
+        self._count_bytes(dump)
+        return dump
+
+    def _count_bytes(self, dump):
+        """Counts the size of some prepared data in `stats`."""
+
+        if not self.stats.enabled:
+            return
+
+        if isinstance(dump, str):
+            size = len(dump.encode())
+        elif isinstance(dump, (bytes, bytearray)):
+            size = len(dump)
+        else:
+            # A `NullLoader` passes objects through
+            # as they are, so their size in memory
+            # is counted.
+            size = tools.sizeof(dump)
+
+        self.stats.record_bytes(size)
+
+    def _remove(self, keys: td.Sequence[str]):
+        """
+        Drops the entries of some keys. Defaults to
+        calling the `delete` method of the manager
+        for each key.
+        """
+
+        delete = getattr(self, "delete", None)
+        if delete is None:
+            raise NotImplementedError(
+                f"{type(self).__name__} cannot drop entries.")
+
+        for key in keys:
+            delete(key)
+
+    def _tag(self, keys: td.Iterable[str], tags: td.Iterable[str]):
+        """Links some keys to the given tags."""
+
+        tags = tuple(tags)
+        for key in keys:
+            self.tags.add(key, tags)
+
+    def _tagged(self, tag: str) -> set[str]:
+        """Unlinks, and returns, the keys of some tag."""
+
+        return self.tags.pop(tag)
+
+    def _untag(self, keys: td.Iterable[str]):
+        """Unlinks some keys from every tag."""
+
+        for key in keys:
+            self.tags.discard(key)
 
 
 class NullCacheManager(SimpleCacheManager[None]):
@@ -49,167 +163,3318 @@ class NullCacheManager(SimpleCacheManager[None]):
     Used as a dummy value.
     """
 
-    def find(self, key: str):
-        return None
+    @stats.record_find
+    def find(self, key: str, default=None):
+        return default
 
+    @tools.record_tags
+    @stats.record_save
     def save(self, key: str, data: td.GT):
         return data
 
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        return dict()
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        return mapping
+
+    def items(self):
+        return iter(())
 
-class MemoryCacheManager(SimpleCacheManager[td.GT]):
+    def _remove(self, keys: td.Sequence[str]):
+        pass
+
+
+class ObjectMode(enum.Enum):
     """
-    Cache manager which stores it's inputs in
-    memory during runtime.
+    How a `MemoryCacheManager` stores objects
+    without serializing them.
     """
 
-    stored_data: dict[str, td.StrOrBytes] = dict()
-
-    def find(self, key: str):
-        found = self.stored_data.get(key, None)
-        if not found:
-            return None
-        return loaders.load(self.serializer, found)
+    REFERENCE = "reference"
+    """
+    Stores and returns the object itself. Changes
+    to it are seen by every caller.
+    """
 
-    def save(self, key: str, data: td.GT):
-        dump = loaders.dump(self.serializer, data)
-        self.stored_data[key] = dump
-        return data
+    COPY = "copy"
+    """
+    Stores, and returns, a shallow copy of the
+    object.
+    """
 
+    FROZEN = "frozen"
+    """
+    Stores, and returns, an immutable view of the
+    object. See `tools.freeze`.
+    """
 
-class LocalDataCacheManager(SimpleCacheManager[td.GT]):
-    """Stores data locally on disc."""
 
-    data_location: td.FilePath
-    """Path to where data is stored."""
+class LocalMemoryCacheManager(SimpleCacheManager[td.GT]):
+    """
+    Stores data in memory during runtime, either
+    serialized or, given an `object_mode`, as
+    objects.
 
-    @property
-    def fileexists(self):
-        """
-        Whether or not the `data_location`
-        attribute points to a valid-- existing--
-        file.
-        """
+    WARNING: not meant to be used directly!
+    """
 
-        path = self.data_location
-        return os.path.exists(path) and os.path.isfile(path)
+    object_mode: td.Optional[ObjectMode]
+    """
+    How objects are stored without serializing
+    them. `None` means data is serialized.
+    """
 
     def __init__(self,
                  *,
-                 data_location: td.OptFilePath = None,
+                 object_mode: td.Optional[ObjectMode | str] = None,
                  serializer: td.Optional[pt.SupportsSerialize] = None,
                  sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
 
         super().__init__(serializer=serializer, sub_ids=sub_ids)
-        self.data_location = tools.get_cache_path(data_location)
+        self.object_mode = ObjectMode(object_mode) if object_mode else None
 
+    def _dump(self, data: td.GT):
+        """Prepares some data to be stored."""
 
-class FileCacheManager(LocalDataCacheManager[td.GT]):
+        if self.object_mode is None:
+            return super()._dump(data)
+
+        if self.object_mode is ObjectMode.COPY:
+            dump = copy.copy(data)
+        elif self.object_mode is ObjectMode.FROZEN:
+            dump = tools.freeze(data)
+        else:
+            dump = data
+
+        self._count_bytes(dump)
+        return dump
+
+    def _load(self, found) -> td.GT:
+        """Prepares some stored data to be returned."""
+
+        if self.object_mode is None:
+            return loaders.load(self.serializer, found)
+        if self.object_mode is ObjectMode.COPY:
+            return copy.copy(found)
+        return found
+
+
+class MemoryCacheManager(LocalMemoryCacheManager[td.GT]):
     """
-    Stores data on disc locally as a file which
-    records some serialized data.
+    Cache manager which stores it's inputs in
+    memory during runtime.
 
-    The intended purpose for this object is to
-    serve single record use.
+    Entries are kept per instance and evicted in
+    least-recently-used order once `max_entries`
+    is exceeded, or their size exceeds
+    `max_bytes`, unless some other eviction
+    `policy` is chosen. See `policies`.
+
+    Given an `object_mode`, objects are stored as
+    they are instead of being serialized.
     """
 
-    serializer: pt.SupportsSerialize[td.GT] = json
+    stored_data: collections.OrderedDict[str, td.Any]
+    """
+    Mapping of keys to stored data. Ordered
+    from least to most recently used when no
+    `policy` is chosen.
+    """
 
-    join_char: str = ":"
+    shared_data: td.ClassVar[collections.OrderedDict[str, td.Any]] = \
+        collections.OrderedDict()
     """
-    Character used to join keys to corresponding
-    data.
+    Store used by every instance constructed with
+    `shared=True`.
     """
 
-    def find(self, key: str):
-        # Avoid catastrophie and skip if no file
-        # exists yet.
-        if not self.fileexists:
-            return None
+    shared_lock: td.ClassVar[threading.RLock] = threading.RLock()
+    """Guards access to `shared_data`."""
 
-        with open(self.data_location, "r") as fd:
-            fkey, found = tools.split_keypair(self.join_char, fd.read())
+    shared_budget: td.ClassVar[tools.ByteBudget] = tools.ByteBudget()
+    """
+    Size of, and limit on, the entries held in
+    `shared_data`.
+    """
 
-            # If the key associated with the file
-            # data does not match the given key,
-            # bail.
-            if fkey != key:
-                return None
-            return loaders.load(self.serializer, found)
+    shared_sizes: td.ClassVar[dict[str, int]] = dict()
+    """Size of each entry held in `shared_data`."""
+
+    shared_tags: td.ClassVar[tools.TagIndex] = tools.TagIndex()
+    """Tags of the entries held in `shared_data`."""
+
+    budget: tools.ByteBudget
+    """
+    Size of, and limit on, the entries held by
+    this manager.
+    """
+
+    max_entries: td.Optional[int]
+    """
+    Maximum number of entries held before the
+    least recently used are evicted. `None`
+    means unbounded.
+    """
+
+    policy: td.Optional[pt.EvictionPolicy]
+    """
+    Decides which entries are kept once
+    `max_entries` is reached. `None` means least
+    recently used entries are evicted.
+    """
+
+    @property
+    def usage(self):
+        """Number of bytes the entries take up."""
+
+        return self.budget.usage
+
+    def __init__(self,
+                 *,
+                 max_entries: td.Optional[int] = tools.DEFAULT_MAX_ENTRIES,
+                 max_bytes: td.Optional[int] = None,
+                 shared: bool = False,
+                 object_mode: td.Optional[ObjectMode | str] = None,
+                 policy: td.Optional[pt.EvictionPolicy | str] = None,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(object_mode=object_mode,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+        self.max_entries = max_entries
+
+        if isinstance(policy, str):
+            policy = policies.make_policy(policy, max_entries)
+        if policy and shared:
+            raise ValueError("the shared store cannot take a policy.")
+        if max_bytes is not None and shared:
+            raise ValueError("the shared store is bounded by `shared_budget`.")
+        self.policy = policy
 
+        if shared:
+            self.stored_data = self.shared_data
+            self.budget = self.shared_budget
+            self._lock = self.shared_lock
+            self._sizes = self.shared_sizes
+            self.tags = self.shared_tags
+        else:
+            self.stored_data = collections.OrderedDict()
+            self.budget = tools.ByteBudget(max_bytes)
+            self._lock = threading.RLock()
+            self._sizes = dict()
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        with self._lock:
+            found = self.stored_data.get(key, tools.MISSING)
+            if found is tools.MISSING:
+                return default
+            self._touch(key)
+
+        return self._load(found)
+
+    @tools.record_tags
+    @stats.record_save
     def save(self, key: str, data: td.GT):
-        with open(self.data_location, "w") as fd:
-            # Ensures given data is written as a
-            # string.
-            dump = str(loaders.dump(self.serializer, data))
-            fd.write(tools.build_keypair(self.join_char, key, dump))
+        dump = self._dump(data)
+
+        with self._lock:
+            self._store(key, dump)
+            self._evict()
+
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        found = dict()
+
+        with self._lock:
+            for key in keys:
+                data = self.stored_data.get(key, tools.MISSING)
+                if data is not tools.MISSING:
+                    self._touch(key)
+                    found[key] = data
+
+        return {k: self._load(v) for k, v in found.items()}
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        dumps = [(k, self._dump(v)) for k, v in mapping.items()]
+
+        with self._lock:
+            for key, dump in dumps:
+                self._store(key, dump)
+            self._evict()
+
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        this manager.
+        """
+
+        with self._lock:
+            stored = list(self.stored_data.items())
+
+        for key, found in stored:
+            yield key, self._load(found)
+
+    def _discard(self, key: str):
+        """
+        Drops some entry, releasing its bytes. The
+        lock must be held.
+        """
+
+        self.stored_data.pop(key, None)
+        self.budget.charge(-self._sizes.pop(key, 0))
+        self.tags.discard(key)
+
+    def _evict(self):
+        """
+        Drops the least recently used entries until
+        this manager is back within bounds.
+        """
+
+        evicted = 0
+        while self.stored_data and (self.budget.exceeded
+                                    or self.max_entries is not None and len(
+                                        self.stored_data) > self.max_entries):
+            if self.policy is None:
+                self._discard(next(iter(self.stored_data)))
+            else:
+                self._discard(self.policy.evict())
+            evicted += 1
+
+        if evicted:
+            self.stats.record_evictions(evicted)
+
+    def _remove(self, keys: td.Sequence[str]):
+        with self._lock:
+            for key in keys:
+                if key in self.stored_data:
+                    self._discard(key)
+                    if self.policy is not None:
+                        self.policy.remove(key)
+
+    def _store(self, key: str, dump):
+        """
+        Stores some prepared data, unless the
+        `policy` rejects it or it could never fit
+        the budget. The lock must be held.
+        """
+
+        size = tools.sizeof(dump)
+        if not self.budget.fits(size):
+            if key in self.stored_data:
+                self._discard(key)
+                if self.policy is not None:
+                    self.policy.remove(key)
+            return
+
+        if self.policy is None:
+            self.stored_data[key] = dump
+            self.stored_data.move_to_end(key)
+        elif key in self.stored_data:
+            self.stored_data[key] = dump
+            self.policy.touch(key)
+        elif self.max_entries is None \
+                or len(self.stored_data) < self.max_entries:
+            self.stored_data[key] = dump
+            self.policy.insert(key)
+        elif self.policy.admit(key):
+            # Room is made before the key is
+            # inserted, so it is never its own
+            # victim.
+            self._discard(self.policy.evict())
+            self.stats.record_evictions()
+            self.stored_data[key] = dump
+            self.policy.insert(key)
+        else:
+            return
+
+        self.budget.charge(size - self._sizes.get(key, 0))
+        self._sizes[key] = size
+
+    def _tag(self, keys: td.Iterable[str], tags: td.Iterable[str]):
+        # Entries refused by the policy, or which
+        # never fit the budget, are not tagged.
+        with self._lock:
+            super()._tag([k for k in keys if k in self.stored_data], tags)
+
+    def _touch(self, key: str):
+        """Records a hit on some key. The lock must be held."""
+
+        if self.policy is None:
+            self.stored_data.move_to_end(key)
+        else:
+            self.policy.touch(key)
 
 
-def _open_shelf(filepath: str) -> shelve.Shelf[td.StrOrBytes]:
+class ShardedMemoryCacheManager(LocalMemoryCacheManager[td.GT]):
     """
-    Open's a shelf in context.
-    NOTE: Must close manually.
+    Memory cache manager which spreads its entries
+    across a number of shards, each guarded by
+    its own lock. Threads working on keys in
+    different shards do not wait on each other.
+
+    The `sub_ids` of this manager are used as a
+    namespace. Views made with `namespace` share
+    the same shards, but never see each other's
+    entries. Each namespace may be given its own
+    byte budget, on top of the `max_bytes` shared
+    by all of them.
+
+    Entries are evicted from each shard in
+    least-recently-used order once the shard
+    holds its share of `max_entries`. Once a
+    namespace exceeds its budget, its least
+    recently used entries are evicted. Once
+    `max_bytes` is exceeded, the least recently
+    used entries of any namespace are. Eviction
+    policies other than least-recently-used are
+    not supported.
     """
 
-    return shelve.open(filepath)  #type: ignore[return-value]
+    shards: tuple[collections.OrderedDict[tuple, tuple[td.Any, int]], ...]
+    """
+    Mappings of namespaced keys to stored data and
+    its size. Each ordered from least to most
+    recently used.
+    """
 
+    shard_max_entries: td.Optional[int]
+    """
+    Maximum number of entries held by each shard.
+    `None` means unbounded.
+    """
 
-class ShelfCacheManager(LocalDataCacheManager[td.GT]):
+    max_entries: td.Optional[int]
     """
-    Stores data on disc locally as a series of
-    shelves using the `shelve` module.
+    Maximum number of entries held across every
+    shard. `None` means unbounded.
+    """
+
+    budget: tools.ByteBudget
+    """
+    Size of, and limit on, the entries held in
+    every namespace.
+    """
+
+    namespace_budget: tools.ByteBudget
+    """
+    Size of, and limit on, the entries held in
+    the namespace of this manager. `budget`
+    covers every namespace.
     """
 
-    # Override this method. `shelve` module
-    # creates multiple files for data store.
     @property
-    def fileexists(self):
-        path = self.data_location
+    def usage(self):
+        """
+        Number of bytes the entries in the
+        namespace of this manager take up.
+        """
 
-        # If is single file instance
-        if os.path.exists(path):
-            return True
+        return self.namespace_budget.usage
 
-        # If is single file db instance.
-        temp_path = ".".join([path, "db"])
-        if os.path.exists(temp_path):
-            return True
+    def __init__(self,
+                 *,
+                 shards: int = tools.DEFAULT_SHARDS,
+                 max_entries: td.Optional[int] = tools.DEFAULT_MAX_ENTRIES,
+                 max_bytes: td.Optional[int] = None,
+                 object_mode: td.Optional[ObjectMode | str] = None,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
 
-        for ext in ("", "db"):
-            temp_path = ".".join([path, ext])
+        if shards < 1:
+            raise ValueError("a sharded cache needs at least one shard.")
 
-            if os.path.exists(temp_path):
-                return True
+        super().__init__(object_mode=object_mode,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+        self.max_entries = max_entries
 
-        # shelve module generates multiple files.
-        for ext in ("dat", "dir", "bak"):
-            temp_path = ".".join([path, ext])
+        self.shards = tuple(collections.OrderedDict() for _ in range(shards))
+        self._locks = tuple(threading.Lock() for _ in range(shards))
+        self.shard_max_entries = None
+        if max_entries is not None:
+            self.shard_max_entries = max(-(-max_entries // shards), 1)
 
-            # If required file doesn't exist,
-            # bail.
-            if not os.path.exists(temp_path):
-                return False
+        self.budget = tools.ByteBudget(max_bytes)
+        self.namespace_budget = tools.ByteBudget()
+        self._budgets = {self.sub_ids: self.namespace_budget}
+        self._tag_indexes = {self.sub_ids: self.tags}
 
-            # If required target is not a file,
-            # bail.
-            if not os.path.isfile(temp_path):
-                return False
+        # Recency of every entry, and of those in
+        # each namespace, from least to most
+        # recently used. Each is only kept while
+        # its budget has a limit, so unbounded
+        # caches never take the lock, which is
+        # taken after any shard lock, never
+        # before.
+        self._order_lock = threading.Lock()
+        self._order: collections.OrderedDict[tuple, None] = \
+            collections.OrderedDict()
+        self._namespace_order: collections.OrderedDict[tuple, None] = \
+            collections.OrderedDict()
+        self._orders = {self.sub_ids: self._namespace_order}
 
-        return True
+    def namespace(self,
+                  *sub_ids: td.StrOrBytes,
+                  max_bytes: td.Optional[int] = None):
+        """
+        Makes a view of this manager, sharing its
+        shards, whose entries are kept apart from
+        every other namespace. Given `max_bytes`,
+        the entries of the namespace are kept
+        within that many bytes.
+        """
 
-    def find(self, key: str):
-        if not self.fileexists:
-            return None
+        view = copy.copy(self)
+        view.sub_ids = self.sub_ids + sub_ids
+        view.stats = stats.CacheStats(enabled=self.stats.enabled)
+        view.namespace_budget = self._budgets.setdefault(
+            view.sub_ids, tools.ByteBudget())
+        view.tags = self._tag_indexes.setdefault(view.sub_ids,
+                                                 tools.TagIndex())
+        view._namespace_order = self._orders.setdefault(
+            view.sub_ids, collections.OrderedDict())
 
-        with _open_shelf(str(self.data_location)) as db:
-            found = db.get(key, None)
-            db.close()
+        if max_bytes is not None:
+            unbounded = view.namespace_budget.limit is None
+            view.namespace_budget.limit = max_bytes
+            if unbounded:
+                view._track_namespace()
+        return view
 
-        if not found:
-            return None
-        return loaders.load(self.serializer, found)
+    @stats.record_find
+    def find(self, key: str, default=None):
+        skey = self._key(key)
+        shard, lock = self._shard(skey)
+
+        with lock:
+            found = shard.get(skey, tools.MISSING)
+            if found is tools.MISSING:
+                return default
+            shard.move_to_end(skey)
+            self._touch((skey, ))
+
+        return self._load(found[0])
 
+    @tools.record_tags
+    @stats.record_save
     def save(self, key: str, data: td.GT):
-        with _open_shelf(str(self.data_location)) as db:
-            db[key] = loaders.dump(self.serializer, data)
-            db.close()
+        skey = self._key(key)
+        dump = self._dump(data)
+        shard, lock = self._shard(skey)
+
+        with lock:
+            self._put(shard, skey, dump)
+            evicted = self._evict_shard(shard)
+
+        self._enforce(evicted)
         return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        found = dict()
+
+        for index, grouped in self._group(keys).items():
+            shard, lock = self.shards[index], self._locks[index]
+            with lock:
+                hits = []
+                for key, skey in grouped:
+                    data = shard.get(skey, tools.MISSING)
+                    if data is not tools.MISSING:
+                        shard.move_to_end(skey)
+                        hits.append(skey)
+                        found[key] = data[0]
+                self._touch(hits)
+
+        return {k: self._load(v) for k, v in found.items()}
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        dumps = {k: self._dump(v) for k, v in mapping.items()}
+        evicted = 0
+
+        for index, grouped in self._group(dumps).items():
+            shard, lock = self.shards[index], self._locks[index]
+            with lock:
+                for key, skey in grouped:
+                    self._put(shard, skey, dumps[key])
+                evicted += self._evict_shard(shard)
+
+        self._enforce(evicted)
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held in
+        the namespace of this manager.
+        """
+
+        for shard, lock in zip(self.shards, self._locks):
+            with lock:
+                stored = [(k[-1], v[0]) for k, v in shard.items()
+                          if k[:-1] == self.sub_ids]
+
+            for key, found in stored:
+                yield key, self._load(found)
+
+    def clear(self):
+        """
+        Drops every entry in the namespace of this
+        manager.
+        """
+
+        for shard, lock in zip(self.shards, self._locks):
+            with lock:
+                for skey in [k for k in shard if k[:-1] == self.sub_ids]:
+                    self._pop(shard, skey)
+
+    def _enforce(self, evicted: int = 0):
+        """
+        Evicts entries until this manager's
+        namespace, and then every namespace, fits
+        its budget.
+        """
+
+        while self.namespace_budget.exceeded \
+                and self._evict_oldest(self.sub_ids):
+            evicted += 1
+        while self.budget.exceeded and self._evict_oldest():
+            evicted += 1
+
+        if evicted:
+            self.stats.record_evictions(evicted)
+
+    def _evict_oldest(self, namespace: td.Optional[tuple] = None) -> bool:
+        """
+        Evicts the least recently used entry,
+        optionally only from some namespace.
+        Returns whether any entry was left to
+        evict.
+        """
+
+        with self._order_lock:
+            order = self._order if namespace is None \
+                else self._orders[namespace]
+            if not order:
+                return False
+            skey = next(iter(order))
+
+        shard, lock = self._shard(skey)
+        with lock:
+            self._pop(shard, skey)
+        return True
+
+    def _evict_shard(self, shard: collections.OrderedDict) -> int:
+        """
+        Drops the least recently used entries of a
+        shard until it is back within bounds. The
+        lock of the shard must be held.
+        """
+
+        if self.shard_max_entries is None:
+            return 0
+
+        evicted = 0
+        while len(shard) > self.shard_max_entries:
+            self._pop(shard, next(iter(shard)))
+            evicted += 1
+        return evicted
+
+    def _group(self, keys: td.Iterable[str]):
+        """
+        Sorts some keys by the shard they belong to
+        so each lock is taken once.
+        """
+
+        grouped = collections.defaultdict(list)
+        for key in keys:
+            skey = self._key(key)
+            grouped[hash(skey) % len(self.shards)].append((key, skey))
+        return grouped
+
+    def _key(self, key: str) -> tuple:
+        """Places some key in this manager's namespace."""
+
+        return (*self.sub_ids, key)
+
+    def _pop(self, shard: collections.OrderedDict, key: tuple):
+        """
+        Drops some entry of a shard, releasing its
+        bytes. The lock of the shard must be held.
+        """
+
+        found = shard.pop(key, None)
+        if found is not None:
+            self.budget.charge(-found[1])
+            self._budgets[key[:-1]].charge(-found[1])
+            self._tag_indexes[key[:-1]].discard(key[-1])
+
+            orders = self._recency(key[:-1])
+            if orders:
+                with self._order_lock:
+                    for order in orders:
+                        order.pop(key, None)
+
+    def _remove(self, keys: td.Sequence[str]):
+        for index, grouped in self._group(keys).items():
+            with self._locks[index]:
+                for _, skey in grouped:
+                    self._pop(self.shards[index], skey)
+
+    def _put(self, shard: collections.OrderedDict, key: tuple, dump):
+        """
+        Stores some prepared data in a shard, unless
+        it could never fit the budgets. The lock of
+        the shard must be held.
+        """
+
+        size = tools.sizeof(dump)
+        if not (self.budget.fits(size) and self.namespace_budget.fits(size)):
+            self._pop(shard, key)
+            return
+
+        old = shard.get(key)
+        shard[key] = (dump, size)
+        shard.move_to_end(key)
+        self._touch((key, ))
+
+        delta = size - (old[1] if old else 0)
+        self.budget.charge(delta)
+        self.namespace_budget.charge(delta)
+
+    def _tag(self, keys: td.Iterable[str], tags: td.Iterable[str]):
+        # Entries which never fit the budgets are
+        # not tagged.
+        stored: list[str] = []
+        for index, grouped in self._group(keys).items():
+            with self._locks[index]:
+                stored.extend(k for k, skey in grouped
+                              if skey in self.shards[index])
+
+        super()._tag(stored, tags)
+
+    def _recency(self, namespace: tuple):
+        """
+        Recency orders kept for the entries of some
+        namespace. Empty when none of their budgets
+        has a limit.
+        """
+
+        orders = []
+        if self.budget.limit is not None:
+            orders.append(self._order)
+        if self._budgets[namespace].limit is not None:
+            orders.append(self._orders[namespace])
+        return orders
+
+    def _touch(self, keys: td.Iterable[tuple]):
+        """
+        Marks some entries of this manager's
+        namespace as the most recently used. The
+        lock of their shard must be held.
+        """
+
+        orders = self._recency(self.sub_ids)
+        if not orders:
+            return
+
+        with self._order_lock:
+            for key in keys:
+                for order in orders:
+                    order[key] = None
+                    order.move_to_end(key)
+
+    def _track_namespace(self):
+        """
+        Starts the recency order of this manager's
+        namespace, once its budget is given a
+        limit. Entries already held are taken to
+        be older than any used since.
+        """
+
+        for shard, lock in zip(self.shards, self._locks):
+            with lock:
+                held = [k for k in shard if k[:-1] == self.sub_ids]
+                with self._order_lock:
+                    for key in reversed(held):
+                        if key not in self._namespace_order:
+                            self._namespace_order[key] = None
+                            self._namespace_order.move_to_end(key, last=False)
+
+        self._enforce()
+
+    def _shard(self, key: tuple):
+        """Shard, and its lock, holding some key."""
+
+        index = hash(key) % len(self.shards)
+        return self.shards[index], self._locks[index]
+
+
+def _fsync_path(path: td.FilePath):
+    """Forces some file, if it exists, out to disc."""
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class LocalDataCacheManager(SimpleCacheManager[td.GT]):
+    """Stores data locally on disc."""
+
+    data_location: td.FilePath
+    """Path to where data is stored."""
+
+    bloom: td.Optional[sketches.BloomFilter] = None
+    """
+    Filter of the keys held on disc, so definite
+    misses never touch the disc. `None` when no
+    filter is kept.
+
+    Only keys saved through this manager, or on
+    disc when it was opened, are known to the
+    filter.
+    """
+
+    persist_bloom: bool = False
+    """
+    Whether `bloom` is saved next to the data, at
+    `bloom_location`, and reused when current.
+    """
+
+    @property
+    def bloom_location(self):
+        """Path to where `bloom` is saved."""
+
+        return f"{self.data_location}.bloom"
+
+    @property
+    def tags_location(self):
+        """Path to the database `tags` are kept in."""
+
+        return f"{os.fsdecode(self.data_location)}.tags"
+
+    @property
+    def fileexists(self):
+        """
+        Whether or not the `data_location`
+        attribute points to a valid-- existing--
+        file.
+        """
+
+        path = self.data_location
+        return os.path.exists(path) and os.path.isfile(path)
+
+    def __init__(self,
+                 *,
+                 data_location: td.OptFilePath = None,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(serializer=serializer, sub_ids=sub_ids)
+        self.data_location = tools.get_cache_path(data_location)
+        if self.tags_location is not None:
+            self.tags = SQLiteTagIndex(self.tags_location)
+
+    def save_bloom(self):
+        """
+        Writes `bloom` next to the data, replacing
+        any older copy.
+        """
+
+        if self.bloom is None:
+            return
+
+        temp_path = f"{self.bloom_location}.tmp"
+        with open(temp_path, "wb") as fd:
+            fd.write(self.bloom.dumps())
+        os.replace(temp_path, self.bloom_location)
+
+    def _data_paths(self) -> tuple[str, ...]:
+        """Files the data of this manager lives in."""
+
+        return (str(self.data_location), )
+
+    def _may_hold(self, key: str) -> bool:
+        """
+        Whether some key may be on disc. Keys the
+        `bloom` has never seen are not.
+        """
+
+        return self.bloom is None or key in self.bloom
+
+    def _open_bloom(self, enabled: bool, persist: bool):
+        """
+        Loads `bloom` from disc, if it is current,
+        or rebuilds it from the keys held.
+        """
+
+        self.bloom, self.persist_bloom = None, persist
+        if not enabled:
+            return
+
+        if persist and self._bloom_current():
+            with contextlib.suppress(ValueError, struct.error):
+                with open(self.bloom_location, "rb") as fd:
+                    self.bloom = sketches.BloomFilter.loads(fd.read())
+                return
+
+        self._rebuild_bloom()
+
+    def _bloom_current(self) -> bool:
+        """
+        Whether the `bloom` saved on disc is newer
+        than the data.
+        """
+
+        try:
+            saved = os.stat(self.bloom_location).st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+        return all(
+            os.stat(p).st_mtime_ns <= saved for p in self._data_paths()
+            if os.path.exists(p))
+
+    def _rebuild_bloom(self):
+        """
+        Makes a new `bloom`, sized for the keys
+        held with room to grow.
+        """
+
+        keys = list(self._stored_keys())
+        bloom = sketches.BloomFilter(
+            max(tools.DEFAULT_BLOOM_CAPACITY, 2 * len(keys)))
+        for key in keys:
+            bloom.add(key)
+
+        self.bloom = bloom
+
+    def _remember(self, keys: td.Iterable[str]):
+        """
+        Adds keys written to disc to `bloom`. The
+        filter is rebuilt once it is overfull.
+        """
+
+        if self.bloom is None:
+            return
+
+        for key in keys:
+            if key not in self.bloom:
+                self.bloom.add(key)
+
+        if self.bloom.overfull:
+            self._rebuild_bloom()
+
+    def _stored_keys(self) -> td.Iterable[str]:
+        """Keys held on disc by this manager."""
+
+        return (key for key, _ in self.items())  #type: ignore[attr-defined]
+
+
+class FileCacheManager(LocalDataCacheManager[td.GT]):
+    """
+    Stores data on disc locally as a file which
+    records some serialized data.
+
+    The intended purpose for this object is to
+    serve single record use.
+    """
+
+    serializer: pt.SupportsSerialize[td.GT] = json
+
+    join_char: str = ":"
+    """
+    Character used to join keys to corresponding
+    data.
+    """
+
+    def __init__(self,
+                 *,
+                 data_location: td.OptFilePath = None,
+                 use_bloom: bool = False,
+                 persist_bloom: bool = False,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(data_location=data_location,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+        self._open_bloom(use_bloom, persist_bloom)
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        # Avoid catastrophie and skip if no file
+        # exists yet.
+        if not self._may_hold(key) or not self.fileexists:
+            return default
+
+        fkey, found = self._read()
+
+        # If the key associated with the file data
+        # does not match the given key, bail.
+        if fkey != key:
+            return default
+        return loaders.load(self.serializer, found)
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        self._write(key, self._dump(data))
+        self._remember((key, ))
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        keys = [k for k in keys if self._may_hold(k)]
+        if not keys:
+            return dict()
+
+        found = dict(self.items())
+        return {k: found[k] for k in keys if k in found}
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        # Only a single record is held, so only
+        # the last pair is written.
+        if mapping:
+            key, data = list(mapping.items())[-1]
+            self._write(key, self._dump(data))
+            self._remember((key, ))
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the single record held by
+        this manager, if any.
+        """
+
+        if not self.fileexists:
+            return
+
+        key, found = self._read()
+        yield key, loaders.load(self.serializer, found)
+
+    def sync(self):
+        """
+        Forces the record out to disc, along with
+        `bloom` if it is persisted.
+        """
+
+        _fsync_path(self.data_location)
+        if self.persist_bloom:
+            self.save_bloom()
+
+    def _read(self) -> tuple[str, td.StrOrBytes]:
+        """
+        Reads the key and raw data of the record
+        held by this manager.
+        """
+
+        with open(self.data_location, "rb") as fd:
+            rkey, found = tools.split_keypair(self.join_char.encode(),
+                                              fd.read())
+
+        if loaders.istagged(found):
+            return rkey.decode(), found
+        return rkey.decode(), found.decode()
+
+    def _write(self, key: str, dump: td.StrOrBytes):
+        """
+        Replaces the record held by this manager.
+        """
+
+        # Data from a `TaggedLoader` is written as
+        # is. Anything else is written as a
+        # string.
+        if isinstance(dump, bytes) and loaders.istagged(dump):
+            join_char, rkey = self.join_char.encode(), key.encode()
+            with open(self.data_location, "wb") as fd:
+                fd.write(tools.build_keypair(join_char, rkey, dump))
+        else:
+            with open(self.data_location, "w") as fd:
+                fd.write(tools.build_keypair(self.join_char, key, str(dump)))
+
+    def _remove(self, keys: td.Sequence[str]):
+        if self.fileexists and self._read()[0] in keys:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.data_location)
+
+
+class LockedFileCacheManager(LocalDataCacheManager[td.GT]):
+    """
+    Stores many records on disc locally in a file
+    which can be shared by several processes on
+    one host.
+
+    Access is guarded by `fcntl` advisory locks
+    on a companion '.lock' file. Readers share
+    the lock while a single writer holds it
+    exclusively. Writes replace the whole file
+    with a temporary copy, so readers never see
+    a partial write.
+
+    Records are mirrored in memory. The mirror is
+    only reread when the modification time of the
+    file shows another process has written to it.
+    """
+
+    serializer: pt.SupportsSerialize[td.GT] = json  #type: ignore[assignment]
+
+    check_interval: float
+    """
+    Seconds during which the mirror is trusted
+    without checking the file for changes. Zero
+    checks on every call.
+    """
+
+    def __init__(self,
+                 *,
+                 data_location: td.OptFilePath = None,
+                 check_interval: float = 0.0,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        if fcntl is None:
+            raise NotImplementedError("file locking requires 'fcntl'.")
+
+        super().__init__(data_location=data_location,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+
+        self.check_interval = check_interval
+
+        self._lock = threading.RLock()
+        self._lock_fd = open(f"{os.fsdecode(self.data_location)}.lock", "a+b")
+        self._mirror: dict[str, td.StrOrBytes] = dict()
+        self._stamp: td.Optional[tuple[int, int, int]] = None
+        self._checked = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """Releases the lock file and the tags."""
+
+        with self._lock:
+            self._lock_fd.close()
+        self.tags.close()
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        with self._lock:
+            self._refresh()
+            found = self._mirror.get(key, tools.MISSING)
+
+        if found is tools.MISSING:
+            return default
+        return loaders.load(self.serializer, found)
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        self._write({key: self._dump(data)})
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        with self._lock:
+            self._refresh()
+            found = {k: self._mirror[k] for k in keys if k in self._mirror}
+
+        return {k: loaders.load(self.serializer, v) for k, v in found.items()}
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        self._write({k: self._dump(v) for k, v in mapping.items()})
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        this manager.
+        """
+
+        with self._lock:
+            self._refresh()
+            stored = list(self._mirror.items())
+
+        for key, found in stored:
+            yield key, loaders.load(self.serializer, found)
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool):
+        """
+        Holds the lock shared between processes.
+        Only one process may hold it exclusively.
+        """
+
+        with self._lock:
+            operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            fcntl.flock(self._lock_fd.fileno(), operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd.fileno(), fcntl.LOCK_UN)
+
+    def _read(self, stamp: tuple[int, int, int]):
+        """
+        Rebuilds the mirror from the file on disc.
+        A lock must be held.
+        """
+
+        mirror = dict()
+        with open(self.data_location, "rb") as fd:
+            buffer = fd.read()
+
+        for flags, key, offset, length in tools.iter_records(buffer):
+            data = buffer[offset:offset + length]
+            mirror[key] = tools.unpack_data(flags, data)
+
+        self._mirror, self._stamp = mirror, stamp
+
+    def _refresh(self, force: bool = False):
+        """
+        Rereads the file if another process has
+        written to it since it was last read.
+        """
+
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return
+        self._checked = now
+
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return
+        if stamp is None:
+            self._mirror, self._stamp = dict(), None
+            return
+
+        with self._locked(exclusive=False):
+            # The file may have been replaced while
+            # waiting on the lock.
+            self._read(self._stat() or stamp)
+
+    def _remove(self, keys: td.Sequence[str]):
+        self._write(dict(), keys)
+
+    def _stat(self) -> td.Optional[tuple[int, int, int]]:
+        """
+        Identifies the current version of the file
+        on disc, if any.
+        """
+
+        try:
+            st = os.stat(self.data_location)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _write(self,
+               dumps: dict[str, td.StrOrBytes],
+               removed: td.Iterable[str] = ()):
+        """
+        Merges some records into the file on disc,
+        and drops the `removed` keys, replacing it
+        atomically.
+        """
+
+        path = os.fsdecode(self.data_location)
+        dirname = os.path.dirname(os.path.abspath(path))
+
+        with self._locked(exclusive=True):
+            # Pick up writes from other processes
+            # before replacing their file.
+            if (stamp := self._stat()) != self._stamp:
+                if stamp is None:
+                    self._mirror = dict()
+                else:
+                    self._read(stamp)
+
+            mirror = {**self._mirror, **dumps}
+            for key in removed:
+                mirror.pop(key, None)
+
+            fd, temp_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as dst:
+                    for key, dump in mirror.items():
+                        dst.write(tools.pack_record(key, dump))
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.replace(temp_path, self.data_location)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+            self._mirror, self._stamp = mirror, self._stat()
+
+
+class LogCacheManager(LocalDataCacheManager[td.GT]):
+    """
+    Stores data on disc locally as an append-only
+    log of binary records. Many records share the
+    one file, which starts with a header naming
+    its format. Files without it are refused.
+
+    An index of keys to record offsets is rebuilt
+    when the log is opened, so reads seek directly
+    to the requested record. Overwritten records
+    are dropped by compaction in the background.
+    """
+
+    serializer: pt.SupportsSerialize[td.GT] = json  #type: ignore[assignment]
+
+    compact_ratio: float
+    """
+    Fraction of the log which may be dead records
+    before compaction is started.
+    """
+
+    compact_min_size: int
+    """
+    Log size, in bytes, below which compaction is
+    never started.
+    """
+
+    def __init__(self,
+                 *,
+                 data_location: td.OptFilePath = None,
+                 compact_ratio: float = 0.5,
+                 compact_min_size: int = 1 << 20,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(data_location=data_location,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+
+        self.compact_ratio = compact_ratio
+        self.compact_min_size = compact_min_size
+
+        self._lock = threading.RLock()
+        self._compactor: td.Optional[threading.Thread] = None
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """
+        Waits on any running compaction, then
+        closes the log.
+        """
+
+        if self._compactor:
+            self._compactor.join()
+
+        with self._lock:
+            self._fd.close()
+        self.tags.close()
+
+    def sync(self):
+        """Forces the log out to disc."""
+
+        with self._lock:
+            self._fd.flush()
+            os.fsync(self._fd.fileno())
+
+    def compact(self):
+        """
+        Rewrites the log keeping only its live
+        records.
+        """
+
+        with self._lock:
+            index, end = dict(self._index), self._size
+
+        path = str(self.data_location)
+        temp_path = path + ".compact"
+        new_index: dict[str, tuple[int, int, int]] = dict()
+
+        # Records before `end` are never modified,
+        # so they are copied without holding the
+        # lock.
+        with open(path, "rb") as src, open(temp_path, "wb") as dst:
+            dst.write(tools.LOG_HEADER.pack(tools.LOG_MAGIC,
+                                            tools.LOG_VERSION))
+            for key, (offset, length, flags) in index.items():
+                start = _record_start(key, offset)
+                src.seek(start)
+
+                new_index[key] = (dst.tell() + offset - start, length, flags)
+                dst.write(src.read(offset + length - start))
+
+            # Records appended while copying are
+            # carried over before swapping files.
+            with self._lock:
+                src.seek(end)
+                tail, base = src.read(self._size - end), dst.tell()
+                dst.write(tail)
+                dst.flush()
+                os.fsync(dst.fileno())
+
+                for flags, key, offset, length in tools.iter_records(tail):
+                    if flags & tools.RECORD_TOMBSTONE:
+                        new_index.pop(key, None)
+                    else:
+                        new_index[key] = (base + offset, length, flags)
+
+                self._fd.close()
+                os.replace(temp_path, path)
+                self._open(new_index)
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        with self._lock:
+            if key not in self._index:
+                return default
+            found = self._read(key)
+
+        return loaders.load(self.serializer, found)
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        record = tools.pack_record(key, self._dump(data))
+
+        with self._lock:
+            self._append(key, record)
+            self._fd.flush()
+        self._maybe_compact()
+
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        found = dict()
+
+        with self._lock:
+            located = [(self._index[k], k) for k in keys if k in self._index]
+
+            # Read in file order to keep the disc
+            # access sequential.
+            for _, key in sorted(located):
+                found[key] = self._read(key)
+
+        return {k: loaders.load(self.serializer, v) for k, v in found.items()}
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        records = [(k, tools.pack_record(k, self._dump(v)))
+                   for k, v in mapping.items()]
+
+        with self._lock:
+            for key, record in records:
+                self._append(key, record)
+            self._fd.flush()
+        self._maybe_compact()
+
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        this manager.
+        """
+
+        with self._lock:
+            keys = list(self._index)
+
+        for key in keys:
+            with self._lock:
+                if key not in self._index:
+                    continue
+                found = self._read(key)
+            yield key, loaders.load(self.serializer, found)
+
+    def _append(self, key: str, record: bytes):
+        """
+        Writes a record to the end of the log and
+        points the index at it.
+        """
+
+        if key in self._index:
+            self._dead += _record_size(key, self._index[key][1])
+
+        flags, _, dlen = tools.RECORD_HEADER.unpack_from(record)
+        offset = self._size + len(record) - dlen
+
+        self._fd.write(record)
+        self._size += len(record)
+
+        if flags & tools.RECORD_TOMBSTONE:
+            self._index.pop(key, None)
+            self._dead += len(record)
+        else:
+            self._index[key] = (offset, dlen, flags)
+
+    def _remove(self, keys: td.Sequence[str]):
+        with self._lock:
+            for key in keys:
+                if key in self._index:
+                    self._append(key, tools.pack_record(key, None))
+            self._fd.flush()
+        self._maybe_compact()
+
+    def _read(self, key: str) -> td.StrOrBytes:
+        """
+        Reads the raw data of some indexed key.
+        NOTE: Must hold the lock.
+        """
+
+        offset, length, flags = self._index[key]
+        self._fd.seek(offset)
+        return tools.unpack_data(flags, self._fd.read(length))
+
+    def _maybe_compact(self):
+        """
+        Starts compaction in the background if
+        enough of the log is dead records.
+        """
+
+        if self._size < self.compact_min_size:
+            return
+        if self._dead < self._size * self.compact_ratio:
+            return
+
+        with self._lock:
+            if self._compactor and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact,
+                                               daemon=True)
+            self._compactor.start()
+
+    def _open(self, index: td.Optional[dict] = None):
+        """
+        Opens the log for appending. Rebuilds the
+        index from the records on disc unless one
+        is given.
+        """
+
+        self._fd = open(self.data_location, "a+b")
+        self._size = os.fstat(self._fd.fileno()).st_size
+        self._dead = 0
+
+        if not self._size:
+            self._fd.write(
+                tools.LOG_HEADER.pack(tools.LOG_MAGIC, tools.LOG_VERSION))
+            self._fd.flush()
+            self._size = tools.LOG_HEADER.size
+        else:
+            self._check_header()
+
+        if index is not None:
+            self._index = index
+            self._dead = self._size - tools.LOG_HEADER.size - sum(
+                _record_size(k, v[1]) for k, v in index.items())
+            return
+
+        self._index = dict()
+        with mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            end = tools.LOG_HEADER.size
+            for flags, key, offset, length in tools.iter_records(buf, end):
+                if key in self._index:
+                    self._dead += _record_size(key, self._index[key][1])
+                if flags & tools.RECORD_TOMBSTONE:
+                    self._index.pop(key, None)
+                    self._dead += _record_size(key, length)
+                else:
+                    self._index[key] = (offset, length, flags)
+                end = offset + length
+
+        # Drop any partially written record left
+        # at the end of the log.
+        if end < self._size:
+            self._fd.truncate(end)
+            self._size = end
+
+    def _check_header(self):
+        """
+        Refuses to open any file which is not a
+        record log this manager can read. The file
+        is closed, and left as it is.
+        """
+
+        self._fd.seek(0)
+        header = self._fd.read(tools.LOG_HEADER.size)
+
+        magic, version = b"", 0
+        if len(header) == tools.LOG_HEADER.size:
+            magic, version = tools.LOG_HEADER.unpack(header)
+        if magic == tools.LOG_MAGIC and version == tools.LOG_VERSION:
+            return
+
+        self._fd.close()
+        if magic == tools.LOG_MAGIC:
+            raise ValueError(f"{self.data_location!s} is a version "
+                             f"{version} record log.")
+        raise ValueError(f"{self.data_location!s} is not a record log.")
+
+
+def _record_size(key: str, length: int) -> int:
+    """Size on disc of some binary record."""
+
+    return tools.RECORD_HEADER.size + len(key.encode()) + length
+
+
+def _record_start(key: str, offset: int) -> int:
+    """
+    Offset of a binary record from the offset of
+    its data.
+    """
+
+    return offset - tools.RECORD_HEADER.size - len(key.encode())
+
+
+_SQLITE_CREATE = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID
+"""
+_SQLITE_FIND = "SELECT data FROM cache WHERE key = ?"
+_SQLITE_FIND_MANY = "SELECT key, data FROM cache WHERE key IN ({})"
+_SQLITE_ITEMS = "SELECT key, data FROM cache"
+_SQLITE_KEYS = "SELECT key FROM cache"
+_SQLITE_SAVE = "INSERT OR REPLACE INTO cache (key, data) VALUES (?, ?)"
+_SQLITE_DELETE = "DELETE FROM cache WHERE key = ?"
+
+_SQLITE_CREATE_TAGS = """
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID
+"""
+_SQLITE_CREATE_TAGS_INDEX = "CREATE INDEX IF NOT EXISTS tags_key ON tags (key)"
+_SQLITE_TAG = "INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)"
+_SQLITE_UNTAG = "DELETE FROM tags WHERE key = ?"
+_SQLITE_DELETE_TAGGED = """
+DELETE FROM cache WHERE key IN (SELECT key FROM tags WHERE tag = ?)
+"""
+_SQLITE_UNTAG_TAGGED = """
+DELETE FROM tags WHERE key IN (SELECT key FROM tags WHERE tag = ?)
+"""
+
+_SQLITE_TAG_KEYS = "SELECT key FROM tags WHERE tag = ?"
+_SQLITE_KEY_TAGS = "SELECT tag FROM tags WHERE key = ?"
+_SQLITE_HAS_TAG = "SELECT 1 FROM tags WHERE tag = ? LIMIT 1"
+_SQLITE_COUNT_TAGS = "SELECT COUNT(DISTINCT tag) FROM tags"
+
+
+class SQLiteTagIndex(tools.TagIndex):
+    """
+    `TagIndex` kept in an `SQLite` database, so
+    it outlives its manager and is shared by
+    every process using the same `location`.
+
+    Each call only touches the rows of the keys
+    or tag concerned. The database is created on
+    the first link, and `SQLite`'s own locking
+    keeps concurrent writers apart.
+    """
+
+    location: str
+    """Path to the database."""
+
+    timeout: float
+    """
+    Seconds to wait on a database locked by
+    some other writer.
+    """
+
+    def __init__(self, location: str, *, timeout: float = 5.0):
+        self.location = location
+        self.timeout = timeout
+
+        self._db: td.Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, tag: str) -> bool:
+        with self._lock:
+            db = self._connect()
+            return bool(db and db.execute(_SQLITE_HAS_TAG, (tag, )).fetchone())
+
+    def __len__(self):
+        with self._lock:
+            db = self._connect()
+            return db.execute(_SQLITE_COUNT_TAGS).fetchone()[0] if db else 0
+
+    def add(self, key: str, tags: td.Iterable[str]):
+        tags = tuple(dict.fromkeys(tags))
+
+        with self._lock:
+            db = self._connect(bool(tags))
+            if db is None:
+                return
+
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(_SQLITE_UNTAG, (key, ))
+                db.executemany(_SQLITE_TAG, ((tag, key) for tag in tags))
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def close(self):
+        """
+        Closes the database. It is reopened if the
+        index is used again.
+        """
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def discard(self, key: str):
+        with self._lock:
+            db = self._connect()
+            if db is not None:
+                db.execute(_SQLITE_UNTAG, (key, ))
+
+    def keys(self, tag: str) -> set[str]:
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return set()
+            return {row[0] for row in db.execute(_SQLITE_TAG_KEYS, (tag, ))}
+
+    def pop(self, tag: str) -> set[str]:
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return set()
+
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                keys = {
+                    row[0]
+                    for row in db.execute(_SQLITE_TAG_KEYS, (tag, ))
+                }
+                db.execute(_SQLITE_UNTAG_TAGGED, (tag, ))
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+            return keys
+
+    def tags(self, key: str) -> tuple[str, ...]:
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return ()
+            return tuple(row[0]
+                         for row in db.execute(_SQLITE_KEY_TAGS, (key, )))
+
+    def _connect(self, create: bool = False):
+        """
+        Returns the connection to the database,
+        opening it if need be. Returns `None` when
+        it does not exist yet, unless `create` is
+        set. The lock must be held.
+        """
+
+        if self._db is not None:
+            return self._db
+        if not create and not os.path.exists(self.location):
+            return None
+
+        # Transactions are managed by this object,
+        # hence no isolation level.
+        db = sqlite3.connect(self.location,
+                             timeout=self.timeout,
+                             isolation_level=None,
+                             check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(_SQLITE_CREATE_TAGS)
+        db.execute(_SQLITE_CREATE_TAGS_INDEX)
+        self._db = db
+        return db
+
+
+class SQLiteCacheManager(LocalDataCacheManager[td.GT]):
+    """
+    Stores data on disc locally in an `SQLite`
+    database running in WAL mode.
+
+    Saves are grouped into transactions of up to
+    `batch_size` writes. Pending writes are
+    visible to this manager immediately, and to
+    other connections once committed.
+
+    Tags are kept in the database next to the
+    entries, rather than in `tags`, so they
+    outlive the manager and are shared by every
+    connection.
+    """
+
+    serializer: pt.SupportsSerialize[td.GT] = json  #type: ignore[assignment]
+
+    tags_location = None
+
+    batch_size: int
+    """
+    Number of saves grouped into a single
+    transaction before it is committed.
+    """
+
+    synchronous: str
+    """
+    `SQLite` synchronous level. One of 'OFF',
+    'NORMAL', 'FULL' or 'EXTRA'.
+    """
+
+    def __init__(self,
+                 *,
+                 data_location: td.OptFilePath = None,
+                 batch_size: int = 1,
+                 synchronous: str = "NORMAL",
+                 timeout: float = 5.0,
+                 use_bloom: bool = False,
+                 persist_bloom: bool = False,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(data_location=data_location,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"invalid synchronous level {synchronous!r}.")
+
+        self.batch_size = max(batch_size, 1)
+        self.synchronous = synchronous.upper()
+
+        self._lock = threading.RLock()
+        self._grouping = 0
+        self._pending = 0
+
+        # Transactions are managed by this object,
+        # hence no isolation level.
+        self._db = sqlite3.connect(self.data_location,
+                                   timeout=timeout,
+                                   isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={self.synchronous}")
+        self._db.execute(_SQLITE_CREATE)
+        self._db.execute(_SQLITE_CREATE_TAGS)
+        self._db.execute(_SQLITE_CREATE_TAGS_INDEX)
+        self._open_bloom(use_bloom, persist_bloom)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """
+        Commits any pending writes and closes the
+        database.
+        """
+
+        with self._lock:
+            self.flush()
+            self._db.close()
+
+            if self.persist_bloom:
+                self.save_bloom()
+
+    def flush(self):
+        """Commits any pending writes."""
+
+        with self._lock:
+            if self._db.in_transaction:
+                self._db.execute("COMMIT")
+            self._pending = 0
+
+    def sync(self):
+        """
+        Commits any pending writes. How far they
+        are forced to disc follows `synchronous`.
+        """
+
+        self.flush()
+
+    def invalidate_tag(self, tag: str) -> int:
+        with self.transaction():
+            if not self._db.in_transaction:
+                self._db.execute("BEGIN")
+            dropped = self._db.execute(_SQLITE_DELETE_TAGGED, (tag, )).rowcount
+            self._db.execute(_SQLITE_UNTAG_TAGGED, (tag, ))
+
+        return dropped
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Groups every save made in context into a
+        single transaction. Commits on exit.
+        """
+
+        with self._lock:
+            self._grouping += 1
+            try:
+                yield self
+            except BaseException:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                self._pending = 0
+                raise
+            finally:
+                self._grouping -= 1
+
+            if not self._grouping:
+                self.flush()
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        if not self._may_hold(key):
+            return default
+
+        with self._lock:
+            found = self._db.execute(_SQLITE_FIND, (key, )).fetchone()
+
+        if found is None:
+            return default
+        return loaders.load(self.serializer, found[0])
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        dump = self._dump(data)
+
+        with self._lock:
+            if not self._db.in_transaction:
+                self._db.execute("BEGIN")
+            self._db.execute(_SQLITE_SAVE, (key, dump))
+            self._remember((key, ))
+
+            self._pending += 1
+            if self._pending >= self.batch_size and not self._grouping:
+                self.flush()
+
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        keys, found = [k for k in keys if self._may_hold(k)], list()
+
+        with self._lock:
+            # Stay below the host parameter limit
+            # of older `SQLite` builds.
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                query = _SQLITE_FIND_MANY.format(", ".join("?" * len(chunk)))
+                found.extend(self._db.execute(query, chunk).fetchall())
+
+        return {k: loaders.load(self.serializer, v) for k, v in found}
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        dumps = [(k, self._dump(v)) for k, v in mapping.items()]
+
+        with self.transaction():
+            if not self._db.in_transaction:
+                self._db.execute("BEGIN")
+            self._db.executemany(_SQLITE_SAVE, dumps)
+            self._remember(mapping)
+
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        this manager.
+        """
+
+        with self._lock:
+            stored = self._db.execute(_SQLITE_ITEMS).fetchall()
+
+        for key, found in stored:
+            yield key, loaders.load(self.serializer, found)
+
+    def _data_paths(self):
+        path = str(self.data_location)
+        return (path, f"{path}-wal")
+
+    def _remove(self, keys: td.Sequence[str]):
+        with self.transaction():
+            if not self._db.in_transaction:
+                self._db.execute("BEGIN")
+            self._db.executemany(_SQLITE_DELETE, ((k, ) for k in keys))
+
+    def _stored_keys(self):
+        with self._lock:
+            return [k for k, in self._db.execute(_SQLITE_KEYS)]
+
+    def _tag(self, keys: td.Iterable[str], tags: td.Iterable[str]):
+        keys, tags = list(keys), tuple(tags)
+
+        with self._lock:
+            if not self._db.in_transaction:
+                self._db.execute("BEGIN")
+            self._db.executemany(_SQLITE_UNTAG, ((k, ) for k in keys))
+            self._db.executemany(_SQLITE_TAG,
+                                 ((t, k) for k in keys for t in tags))
+
+            # Tags ride along with the saves they
+            # belong to, which may already be
+            # committed.
+            if not self._pending and not self._grouping:
+                self.flush()
+
+    def _untag(self, keys: td.Iterable[str]):
+        with self.transaction():
+            if not self._db.in_transaction:
+                self._db.execute("BEGIN")
+            self._db.executemany(_SQLITE_UNTAG, ((k, ) for k in keys))
+
+
+class SnapshotCacheManager(LocalDataCacheManager[td.GT]):
+    """
+    Serves data from a read-only snapshot file
+    written by `tools.write_snapshot`.
+
+    The snapshot is memory-mapped, so nothing is
+    loaded up front and processes reading the
+    same snapshot share its pages. Saves are
+    passed through without being stored, so
+    nothing is ever tagged.
+    """
+
+    serializer: pt.SupportsSerialize[td.GT] = json  #type: ignore[assignment]
+
+    tags_location = None
+
+    def __init__(self,
+                 *,
+                 data_location: td.OptFilePath = None,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(data_location=data_location,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+
+        self._buffer: td.Optional[mmap.mmap] = None
+        self._slots = 0
+        self.reload()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """Unmaps the snapshot."""
+
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+            self._slots = 0
+
+    def reload(self):
+        """
+        Maps the snapshot at `data_location`.
+        Call again after the snapshot has been
+        rewritten.
+        """
+
+        self.close()
+        if not self.fileexists:
+            return
+
+        with open(self.data_location, "rb") as fd:
+            buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, _, slots = tools.SNAPSHOT_HEADER.unpack_from(buffer)
+        if magic != tools.SNAPSHOT_MAGIC:
+            buffer.close()
+            raise ValueError(f"{self.data_location!s} is not a snapshot.")
+
+        self._buffer, self._slots = buffer, slots
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        buffer = self._buffer
+        if buffer is None or not self._slots:
+            return default
+
+        rkey = key.encode()
+        khash = tools.snapshot_hash(rkey)
+        view = memoryview(buffer)
+
+        slot = khash % self._slots
+        for _ in range(self._slots):
+            shash, offset = tools.SNAPSHOT_SLOT.unpack_from(
+                buffer,
+                tools.SNAPSHOT_HEADER.size + slot * tools.SNAPSHOT_SLOT.size)
+
+            if not offset:
+                return default
+
+            if shash == khash:
+                flags, klen, dlen = tools.RECORD_HEADER.unpack_from(
+                    buffer, offset)
+                start = offset + tools.RECORD_HEADER.size
+
+                if view[start:start + klen] == rkey:
+                    start += klen
+                    found = tools.unpack_data(flags,
+                                              buffer[start:start + dlen])
+                    return loaders.load(self.serializer, found)
+
+            slot = (slot + 1) % self._slots
+
+        return default
+
+    @tools.record_tags
+    def save(self, key: str, data: td.GT):
+        return data
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        this snapshot.
+        """
+
+        buffer = self._buffer
+        if buffer is None or not self._slots:
+            return
+
+        start = tools.SNAPSHOT_HEADER.size \
+            + self._slots * tools.SNAPSHOT_SLOT.size
+        for flags, key, offset, length in tools.iter_records(buffer, start):
+            found = tools.unpack_data(flags, buffer[offset:offset + length])
+            yield key, loaders.load(self.serializer, found)
+
+    def _tag(self, keys: td.Iterable[str], tags: td.Iterable[str]):
+        pass
+
+
+class SharedMemoryCacheManager(SimpleCacheManager[td.GT]):
+    """
+    Stores small entries in a fixed-size hash
+    table held in shared memory. Any process on
+    the host which knows the `name` of the table
+    can attach to it.
+
+    Each slot carries a version counter which is
+    odd while the slot is being written. Readers
+    never take a lock; they retry any slot whose
+    version changed while it was read. Writers
+    are serialized by an `fcntl` lock.
+
+    Entries too large for a slot are not stored.
+    Once the probed slots are full, the entry in
+    the first of them is evicted.
+
+    The table lives until `unlink` is called,
+    even after every process has detached.
+    """
+
+    serializer: pt.SupportsSerialize[td.GT] = json  #type: ignore[assignment]
+
+    name: str
+    """Name of the shared memory segment."""
+
+    slots: int
+    """Number of slots in the table."""
+
+    slot_size: int
+    """Size, in bytes, of each slot."""
+
+    @property
+    def tags_location(self):
+        """
+        Path to the database `tags` are kept in,
+        next to the writer lock of the table.
+        """
+
+        return tools.get_runtime_path(f"{self.name}.tags")
+
+    def __init__(self,
+                 name: td.Optional[str] = None,
+                 *,
+                 slots: int = tools.DEFAULT_SHARED_SLOTS,
+                 slot_size: int = tools.DEFAULT_SHARED_SLOT_SIZE,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        if fcntl is None:
+            raise NotImplementedError("file locking requires 'fcntl'.")
+        if slot_size <= tools.SHARED_SLOT.size:
+            raise ValueError(f"slot size must exceed "
+                             f"{tools.SHARED_SLOT.size} bytes.")
+
+        super().__init__(serializer=serializer, sub_ids=sub_ids)
+
+        self.name = name or f"ampyr-{os.getpid()}-{id(self):x}"
+        self.tags = SQLiteTagIndex(self.tags_location)
+        self._lock = threading.Lock()
+        self._lock_fd = open(tools.get_runtime_path(f"{self.name}.lock"),
+                             "a+b")
+
+        with self._locked():
+            self._attach(slots, slot_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """
+        Detaches from the table. The table lives on
+        for other processes.
+        """
+
+        if self._buffer is not None:
+            self._buffer = None
+            self._segment.close()
+            self._lock_fd.close()
+            self.tags.close()
+
+    def unlink(self):
+        """
+        Destroys the table. Processes still
+        attached keep their view of it.
+        """
+
+        # `unlink` expects the table to be known
+        # to the resource tracker.
+        resource_tracker.register(
+            self._segment._name,  #type: ignore[attr-defined]
+            "shared_memory")
+        self._segment.unlink()
+        self.tags.close()
+
+        tags = self.tags_location
+        for path in (self._lock_fd.name, tags, f"{tags}-wal", f"{tags}-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        found = self._find(key.encode(), tools.MISSING)
+        if found is tools.MISSING:
+            return default
+        return loaders.load(self.serializer, found)
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        self._write(key.encode(), self._dump(data))
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        found = dict()
+        for key in keys:
+            data = self._find(key.encode(), tools.MISSING)
+            if data is not tools.MISSING:
+                found[key] = loaders.load(self.serializer, data)
+        return found
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        dumps = [(k.encode(), self._dump(v)) for k, v in mapping.items()]
+        with self._locked():
+            for rkey, dump in dumps:
+                self._write(rkey, dump, locked=True)
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held in
+        the table.
+        """
+
+        for slot in range(self.slots):
+            version, _, flags, rkey, found = self._read_slot(slot)
+            if version and not flags & tools.RECORD_TOMBSTONE:
+                found = tools.unpack_data(flags, found)
+                yield rkey.decode(), loaders.load(self.serializer, found)
+
+    def _attach(self, slots: int, slot_size: int):
+        """
+        Creates the table, or attaches to it if it
+        already exists. The writer lock must be
+        held.
+        """
+
+        size, created = tools.SHARED_HEADER.size + slots * slot_size, True
+        try:
+            segment = shared_memory.SharedMemory(self.name, True, size)
+        except FileExistsError:
+            segment, created = shared_memory.SharedMemory(self.name), False
+
+        buffer = segment.buf
+        if buffer is None:
+            segment.close()
+            raise ValueError(f"{self.name!r} could not be mapped.")
+
+        if created:
+            tools.SHARED_HEADER.pack_into(buffer, 0, tools.SHARED_MAGIC, 1,
+                                          slots, slot_size)
+        else:
+            magic, _, slots, slot_size = tools.SHARED_HEADER.unpack_from(
+                buffer)
+            if magic != tools.SHARED_MAGIC:
+                segment.close()
+                raise ValueError(f"{self.name!r} is not a cache table.")
+
+        # The table outlives the processes using
+        # it, so it is kept from the resource
+        # tracker which would destroy it at exit.
+        resource_tracker.unregister(
+            segment._name,  #type: ignore[attr-defined]
+            "shared_memory")
+
+        self._segment, self._buffer = segment, buffer
+        self.slots, self.slot_size = slots, slot_size
+
+    def _find(self, rkey: bytes, default):
+        """
+        Looks up the raw data of some key without
+        taking any lock.
+        """
+
+        khash = tools.snapshot_hash(rkey)
+        for slot in self._probe(khash):
+            version, shash, flags, skey, found = self._read_slot(slot)
+            if not version:
+                break
+            if shash == khash and skey == rkey:
+                if flags & tools.RECORD_TOMBSTONE:
+                    break
+                return tools.unpack_data(flags, found)
+
+        return default
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Holds the writer lock of the table."""
+
+        with self._lock:
+            fcntl.flock(self._lock_fd.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd.fileno(), fcntl.LOCK_UN)
+
+    def _probe(self, khash: int):
+        """Slots which may hold some key hash."""
+
+        start = khash % self.slots
+        for step in range(min(tools.SHARED_PROBE_LIMIT, self.slots)):
+            yield (start + step) % self.slots
+
+    def _read_slot(self, slot: int):
+        """
+        Reads a consistent copy of some slot,
+        retrying while it is being written. A slot
+        still being written after
+        `SHARED_READ_RETRIES` reads is taken to be
+        empty.
+        """
+
+        buffer, size = self._buffer, tools.SHARED_SLOT.size
+        offset = tools.SHARED_HEADER.size + slot * self.slot_size
+        limit = offset + self.slot_size
+
+        for _ in range(tools.SHARED_READ_RETRIES):
+            version, khash, flags, klen, dlen = tools.SHARED_SLOT.unpack_from(
+                buffer, offset)  #type: ignore[arg-type]
+            if version & 1:
+                time.sleep(0)
+                continue
+
+            start = offset + size
+            payload = bytes(buffer[start:min(start + klen + dlen, limit)])
+            if tools.SHARED_SLOT.unpack_from(buffer, offset)[0] == version:
+                return version, khash, flags, payload[:klen], payload[klen:]
+
+        # Only a writer which died part way leaves
+        # a slot odd for so long.
+        return 0, 0, 0, b"", b""
+
+    def _remove(self, keys: td.Sequence[str]):
+        with self._locked():
+            for key in keys:
+                rkey = key.encode()
+                if self._find(rkey, tools.MISSING) is not tools.MISSING:
+                    self._write(rkey, None, locked=True)
+
+    def _write(self,
+               rkey: bytes,
+               dump: td.StrOrBytes | None,
+               *,
+               locked: bool = False):
+        """
+        Writes some raw data to the slot for its
+        key. `None`, or data too large for a slot,
+        leaves a tombstone behind instead.
+        """
+
+        if not locked:
+            with self._locked():
+                return self._write(rkey, dump, locked=True)
+
+        # Keys too large for any slot are never
+        # stored, so there is nothing to replace.
+        if tools.SHARED_SLOT.size + len(rkey) > self.slot_size:
+            return
+
+        flags, data = 0, dump
+        if data is None:
+            flags, data = tools.RECORD_TOMBSTONE, b""
+        elif isinstance(data, str):
+            flags, data = tools.RECORD_TEXT, data.encode()
+        if tools.SHARED_SLOT.size + len(rkey) + len(data) > self.slot_size:
+            flags, data = tools.RECORD_TOMBSTONE, b""
+
+        khash, target, evicting = tools.snapshot_hash(rkey), None, False
+        for slot in self._probe(khash):
+            version, shash, _, skey, _ = self._read_slot(slot)
+            if not version or (shash == khash and skey == rkey):
+                target = slot
+                break
+        else:
+            target, evicting = khash % self.slots, True
+
+        buffer = self._buffer
+        offset = tools.SHARED_HEADER.size + target * self.slot_size
+        version = tools.SHARED_SLOT.unpack_from(
+            buffer, offset)[0]  #type: ignore[arg-type]
+        # A writer which died part way may have
+        # left the version odd.
+        version += version & 1
+
+        tools.SHARED_SLOT.pack_into(buffer, offset, version + 1, khash, flags,
+                                    len(rkey), len(data))
+        start = offset + tools.SHARED_SLOT.size
+        buffer[start:start + len(rkey) + len(data)] = rkey + data
+        struct.pack_into(">Q", buffer, offset, version + 2)
+
+        if evicting:
+            self.stats.record_evictions()
+
+
+def _open_shelf(filepath: str,
+                backend: td.OptString = None) -> shelve.Shelf[td.StrOrBytes]:
+    """
+    Open's a shelf in context. If a `backend` is
+    given, it names the `dbm` module used to
+    store the shelf (e.g. 'dbm.gnu').
+    NOTE: Must close manually.
+    """
+
+    if not backend:
+        return shelve.open(filepath)  #type: ignore[return-value]
+
+    database = importlib.import_module(backend).open(filepath, "c")
+    return shelve.Shelf(database)  #type: ignore[return-value]
+
+
+class ShelfCacheManager(LocalDataCacheManager[td.GT]):
+    """
+    Stores data on disc locally as a series of
+    shelves using the `shelve` module.
+
+    When constructed with `persistent=True` the
+    shelf is held open for the lifetime of the
+    manager, or until `close` is called.
+    """
+
+    backend: td.OptString
+    """
+    Name of the `dbm` module used to store the
+    shelf. Lets `shelve` decide when `None`.
+    """
+
+    persistent: bool
+    """
+    Whether the shelf is kept open between
+    transactions.
+    """
+
+    # Override this method. `shelve` module
+    # creates multiple files for data store.
+    @property
+    def fileexists(self):
+        # Shelves are never removed by this
+        # manager, so a positive result is
+        # remembered.
+        if self._exists:
+            return True
+
+        path = str(self.data_location)
+
+        # Single file instances, single file db
+        # instances, or the multiple files
+        # generated by `dbm.dumb`.
+        for ext in ("", ".db", ".dir"):
+            if os.path.isfile(path + ext):
+                self._exists = True
+                break
+
+        return self._exists
+
+    def __init__(self,
+                 *,
+                 data_location: td.OptFilePath = None,
+                 backend: td.OptString = None,
+                 persistent: bool = False,
+                 use_bloom: bool = False,
+                 persist_bloom: bool = False,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(data_location=data_location,
+                         serializer=serializer,
+                         sub_ids=sub_ids)
+
+        self.backend = backend
+        self.persistent = persistent
+
+        self._exists = False
+        self._lock = threading.RLock()
+        self._shelf: td.Optional[shelve.Shelf[td.StrOrBytes]] = None
+        self._open_bloom(use_bloom, persist_bloom)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the shelf held open by this
+        manager, if any.
+        """
+
+        with self._lock:
+            if self._shelf is not None:
+                self._shelf.close()
+                self._shelf = None
+
+            if self.persist_bloom:
+                self.save_bloom()
+        self.tags.close()
+
+    def sync(self):
+        """Forces the files of the shelf out to disc."""
+
+        with self._lock:
+            if self._shelf is not None:
+                self._shelf.sync()
+
+            path = str(self.data_location)
+            for ext in ("", ".db", ".dir", ".dat"):
+                _fsync_path(path + ext)
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        if not self._may_hold(key):
+            return default
+
+        with self._lock:
+            if self._shelf is None and not self.fileexists:
+                return default
+
+            with self._open() as db:
+                found = db.get(key, tools.MISSING)
+
+        if found is tools.MISSING:
+            return default
+        return loaders.load(self.serializer, found)
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        dump = self._dump(data)
+
+        with self._lock:
+            with self._open() as db:
+                db[key] = dump
+            self._exists = True
+            self._remember((key, ))
+
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        keys = [k for k in keys if self._may_hold(k)]
+        found: dict[str, td.StrOrBytes] = dict()
+
+        with self._lock:
+            if not keys or self._shelf is None and not self.fileexists:
+                return found
+
+            with self._open() as db:
+                for key in keys:
+                    if (data := db.get(key,
+                                       tools.MISSING)) is not tools.MISSING:
+                        found[key] = data
+
+        return {k: loaders.load(self.serializer, v) for k, v in found.items()}
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        dumps = [(k, self._dump(v)) for k, v in mapping.items()]
+
+        with self._lock:
+            with self._open() as db:
+                for key, dump in dumps:
+                    db[key] = dump
+            self._exists = True
+            self._remember(mapping)
+
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        this manager.
+        """
+
+        with self._lock:
+            if self._shelf is None and not self.fileexists:
+                return
+
+            with self._open() as db:
+                stored = list(db.items())
+
+        for key, found in stored:
+            yield key, loaders.load(self.serializer, found)
+
+    def _data_paths(self):
+        path = str(self.data_location)
+        return tuple(path + ext for ext in ("", ".db", ".dir", ".dat"))
+
+    def _remove(self, keys: td.Sequence[str]):
+        with self._lock:
+            if self._shelf is None and not self.fileexists:
+                return
+
+            with self._open() as db:
+                for key in keys:
+                    db.pop(key, None)
+
+    def _stored_keys(self):
+        with self._lock:
+            if self._shelf is None and not self.fileexists:
+                return []
+
+            with self._open() as db:
+                return list(db.keys())
+
+    @contextlib.contextmanager
+    def _open(self):
+        """
+        Yields the shelf for a single transaction.
+        Closes it afterwards unless the manager is
+        persistent.
+        """
+
+        if self._shelf is not None:
+            yield self._shelf
+            return
+
+        db = _open_shelf(str(self.data_location), self.backend)
+        if self.persistent:
+            self._shelf = db
+            yield db
+            return
+
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+class TieredCacheManager(SimpleCacheManager[td.GT]):
+    """
+    Places a small `MemoryCacheManager` in front
+    of some slower `CacheManager`.
+
+    Reads check the memory tier first and promote
+    hits from the slower tier into it. Saves are
+    written through to both tiers.
+    """
+
+    l1: MemoryCacheManager[td.GT]
+    """Memory tier. Checked first."""
+
+    l2: pt.CacheManager[td.GT]
+    """Slower, usually persistent, tier."""
+
+    def __init__(self,
+                 l2: td.Optional[pt.CacheManager[td.GT]] = None,
+                 *,
+                 l1_max_entries: td.Optional[int] = tools.DEFAULT_L1_ENTRIES,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(serializer=serializer, sub_ids=sub_ids)
+
+        self.l1 = MemoryCacheManager(max_entries=l1_max_entries,
+                                     serializer=self.serializer,
+                                     sub_ids=self.sub_ids)
+        self.l2 = l2 or ShelfCacheManager(sub_ids=self.sub_ids)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """Closes the slower tier, if it can be."""
+
+        if hasattr(self.l2, "close"):
+            self.l2.close()
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        found = self.l1.find(key, tools.MISSING)
+        if found is not tools.MISSING:
+            return found
+
+        found = self.l2.find(key, tools.MISSING)
+        if found is tools.MISSING:
+            return default
+
+        self.l1.save(key, found)
+        return found
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        self.l2.save(key, data)
+        return self.l1.save(key, data)
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        keys = list(keys)
+        found = self.l1.find_many(keys)
+
+        missing = [k for k in keys if k not in found]
+        if missing:
+            promote = self.l2.find_many(missing)
+            self.l1.save_many(promote)
+            found.update(promote)
+
+        return found
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        self.l2.save_many(mapping)
+        return self.l1.save_many(mapping)
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        the slower tier.
+        """
+
+        yield from self.l2.items()  #type: ignore[attr-defined]
+
+    def _remove(self, keys: td.Sequence[str]):
+        self.l2.invalidate_many(keys)  #type: ignore[attr-defined]
+        self.l1.invalidate_many(keys)
+
+
+class HashRingCacheManager(SimpleCacheManager[td.GT]):
+    """
+    Spreads keys across a number of `CacheManager`
+    nodes, local or remote, by consistent hashing.
+
+    Each node is placed on the ring `vnodes`
+    times, so adding or removing a node only
+    moves the keys next to its points. Entries
+    are saved to `replicas` nodes. Nodes which
+    fail a `ping`, or raise an `OSError`, are
+    skipped until `health_interval` has passed,
+    and the next nodes on the ring are used.
+    """
+
+    nodes: dict[str, pt.CacheManager[td.GT]]
+    """Mapping of node names to their managers."""
+
+    vnodes: int
+    """Number of ring points given to each node."""
+
+    replicas: int
+    """Number of nodes each entry is saved to."""
+
+    health_interval: float
+    """
+    Seconds the result of a node health check is
+    trusted.
+    """
+
+    def __init__(
+            self,
+            nodes: td.Optional[dict[str, pt.CacheManager[td.GT]]
+                               | td.Sequence[pt.CacheManager[td.GT]]] = None,
+            *,
+            vnodes: int = tools.DEFAULT_VNODES,
+            replicas: int = 1,
+            health_interval: float = tools.DEFAULT_HEALTH_INTERVAL,
+            serializer: td.Optional[pt.SupportsSerialize] = None,
+            sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(serializer=serializer, sub_ids=sub_ids)
+
+        # Unnamed nodes are named by position, so
+        # they should be given in the same order
+        # by every client.
+        if nodes is None:
+            nodes = [MemoryCacheManager(serializer=self.serializer)]
+        if not isinstance(nodes, dict):
+            nodes = {f"node-{i}": n for i, n in enumerate(nodes)}
+
+        self.vnodes = vnodes
+        self.replicas = replicas
+        self.health_interval = health_interval
+
+        self.nodes = dict()
+        self._health: dict[str, tuple[bool, float]] = dict()
+        self._lock = threading.Lock()
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        self._members: dict[str, pt.CacheManager[td.GT]] = dict()
+
+        for name, node in nodes.items():
+            self.add_node(name, node)
+
+    def add_node(self, name: str, node: pt.CacheManager[td.GT]):
+        """Places a node on the ring."""
+
+        with self._lock:
+            self.nodes[name] = node
+            self._health.pop(name, None)
+            self._build()
+
+    def remove_node(self, name: str) -> pt.CacheManager[td.GT]:
+        """Takes a node off the ring."""
+
+        with self._lock:
+            node = self.nodes.pop(name)
+            self._health.pop(name, None)
+            self._build()
+
+        return node
+
+    def locate(self, key: str) -> list[str]:
+        """
+        Names of the healthy nodes, in ring order,
+        which hold some key.
+        """
+
+        return list(self._locate(key))
+
+    def healthy(self, name: str) -> bool:
+        """
+        Whether some node answered its last health
+        check. Nodes without a `ping` method are
+        always healthy.
+        """
+
+        now = time.monotonic()
+        state = self._health.get(name)
+        if state and now - state[1] < self.health_interval:
+            return state[0]
+
+        node, up = self.nodes.get(name), True
+        if node is None:
+            # Nodes removed from the ring are never
+            # healthy.
+            up = False
+        elif hasattr(node, "ping"):
+            try:
+                up = node.ping() == td.ReturnState.SUCCESS
+            except OSError:
+                up = False
+
+        self._health[name] = (up, now)
+        return up
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        for name, node in self._locate(key).items():
+            try:
+                found = node.find(key, tools.MISSING)
+            except OSError:
+                self._fail(name)
+                continue
+
+            if found is not tools.MISSING:
+                return found
+
+        return default
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        for name, node in self._locate(key).items():
+            try:
+                node.save(key, data)
+            except OSError:
+                self._fail(name)
+
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        found: dict[str, td.GT] = dict()
+        pending = {
+            k: list(self._locate(k).items())
+            for k in dict.fromkeys(keys)
+        }
+
+        # Keys are asked of their first healthy
+        # replica, then of the next for as long
+        # as they go unfound.
+        while pending:
+            grouped = collections.defaultdict(list)
+            members = dict()
+            for key, located in pending.items():
+                if located:
+                    name, node = located.pop(0)
+                    grouped[name].append(key)
+                    members[name] = node
+
+            if not grouped:
+                break
+
+            for name, group in grouped.items():
+                try:
+                    found.update(members[name].find_many(group))
+                except OSError:
+                    self._fail(name)
+
+            pending = {k: v for k, v in pending.items() if k not in found}
+
+        return found
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        grouped: collections.defaultdict[str, dict[str, td.GT]] = \
+            collections.defaultdict(dict)
+        members = dict()
+        for key, data in mapping.items():
+            for name, node in self._locate(key).items():
+                grouped[name][key], members[name] = data, node
+
+        for name, group in grouped.items():
+            try:
+                members[name].save_many(group)
+            except OSError:
+                self._fail(name)
+
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        every healthy node. Replicated keys are
+        given once.
+        """
+
+        seen = set()
+        for name, node in list(self.nodes.items()):
+            if not self.healthy(name):
+                continue
+
+            for key, found in node.items():  #type: ignore[attr-defined]
+                if key not in seen:
+                    seen.add(key)
+                    yield key, found
+
+    def _remove(self, keys: td.Sequence[str]):
+        grouped = collections.defaultdict(list)
+        members = dict()
+        for key in keys:
+            for name, node in self._locate(key).items():
+                grouped[name].append(key)
+                members[name] = node
+
+        for name, group in grouped.items():
+            try:
+                members[name].invalidate_many(  #type: ignore[attr-defined]
+                    group)
+            except OSError:
+                self._fail(name)
+
+    def _build(self):
+        """
+        Rebuilds the ring points of every node. The
+        lock must be held.
+        """
+
+        ring = sorted((tools.snapshot_hash(f"{name}#{i}"), name)
+                      for name in self.nodes for i in range(self.vnodes))
+        self._points = [point for point, _ in ring]
+        self._owners = [name for _, name in ring]
+        self._members = dict(self.nodes)
+
+    def _locate(self, key: str) -> dict[str, pt.CacheManager[td.GT]]:
+        """
+        Healthy nodes, in ring order, which hold
+        some key, by name. Nodes are taken from
+        the same build of the ring as its points,
+        so removing a node meanwhile never breaks
+        a lookup.
+        """
+
+        with self._lock:
+            points, owners = self._points, self._owners
+            members = self._members
+
+        located: dict[str, pt.CacheManager[td.GT]] = dict()
+        if not points:
+            return located
+
+        start = bisect.bisect(points, tools.snapshot_hash(key))
+        for step in range(len(points)):
+            name = owners[(start + step) % len(points)]
+            if name in located or not self.healthy(name):
+                continue
+
+            located[name] = members[name]
+            if len(located) == self.replicas:
+                break
+
+        return located
+
+    def _fail(self, name: str):
+        """Marks some node as unhealthy."""
+
+        self._health[name] = (False, time.monotonic())
+
+
+class WriteBehindCacheManager(SimpleCacheManager[td.GT]):
+    """
+    Buffers saves in memory in front of some
+    slower `CacheManager`, usually one on disc.
+
+    Reads are served from the buffer first. The
+    buffer is written out in one batch, followed
+    by a single `sync` of the slower manager, by
+    a background thread once it holds
+    `max_pending` entries, every `flush_interval`
+    seconds, and on `close` or exit. The thread
+    only runs while entries are buffered.
+    """
+
+    backend: pt.CacheManager[td.GT]
+    """Manager the buffer is written out to."""
+
+    max_pending: int
+    """
+    Number of buffered entries from which the
+    buffer is written out.
+    """
+
+    flush_interval: float
+    """
+    Maximum number of seconds entries wait in the
+    buffer.
+    """
+
+    def __init__(self,
+                 backend: td.Optional[pt.CacheManager[td.GT]] = None,
+                 *,
+                 max_pending: int = tools.DEFAULT_WRITE_BUFFER,
+                 flush_interval: float = 1.0,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(serializer=serializer, sub_ids=sub_ids)
+
+        self.backend = backend or ShelfCacheManager(sub_ids=self.sub_ids)
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+
+        self._pending: dict[str, td.GT] = dict()
+        self._flushing: dict[str, td.GT] = dict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._flusher: td.Optional[threading.Thread] = None
+
+        _WRITE_BEHIND.add(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.close()
+
+    def close(self):
+        """
+        Writes out the buffer, stops the background
+        thread and closes the slower manager, if
+        it can be.
+        """
+
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            flusher, self._flusher = self._flusher, None
+
+        if flusher:
+            flusher.join()
+        self.flush()
+
+        if hasattr(self.backend, "close"):
+            self.backend.close()
+
+    def flush(self):
+        """
+        Writes out every buffered entry in one
+        batch, then syncs the slower manager.
+        """
+
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, dict()
+                self._flushing = batch
+
+            try:
+                self.backend.save_many(batch)
+                if hasattr(self.backend, "sync"):
+                    self.backend.sync()
+            except BaseException:
+                # Entries saved since are newer than
+                # those which failed.
+                with self._lock:
+                    self._pending = {**batch, **self._pending}
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = dict()
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        found = self._find_buffered(key)
+        if found is tools.MISSING:
+            return self.backend.find(key, default)
+        return found
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        self._buffer({key: data})
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        found = dict()
+        missing = []
+
+        for key in keys:
+            data = self._find_buffered(key)
+            if data is tools.MISSING:
+                missing.append(key)
+            else:
+                found[key] = data
+
+        if missing:
+            found.update(self.backend.find_many(missing))
+        return found
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        self._buffer(mapping)
+        return mapping
+
+    def items(self):
+        """
+        Iterates over the keys and data held by
+        the slower manager, and those still in the
+        buffer.
+        """
+
+        with self._lock:
+            buffered = {**self._flushing, **self._pending}
+
+        for key, found in self.backend.items():  #type: ignore[attr-defined]
+            if key not in buffered:
+                yield key, found
+        yield from buffered.items()
+
+    def _buffer(self, mapping: dict[str, td.GT]):
+        with self._lock:
+            if self._closed:
+                raise ValueError("cannot save to a closed cache manager.")
+
+            self._pending.update(mapping)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run,
+                                                 name="ampyr-write-behind",
+                                                 daemon=True)
+                self._flusher.start()
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.notify()
+
+    def _find_buffered(self, key: str):
+        with self._lock:
+            found = self._pending.get(key, tools.MISSING)
+            if found is tools.MISSING:
+                found = self._flushing.get(key, tools.MISSING)
+        return found
+
+    def _remove(self, keys: td.Sequence[str]):
+        # Waits on any batch being written, so it
+        # cannot bring dropped entries back.
+        with self._flush_lock:
+            with self._lock:
+                for key in keys:
+                    self._pending.pop(key, None)
+            self.backend.invalidate_many(keys)  #type: ignore[attr-defined]
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._wakeup.wait_for(
+                    lambda: self._closed or len(self._pending) >= self.
+                    max_pending, self.flush_interval)
+                if self._closed:
+                    return
+
+            # A failed batch is kept in the buffer
+            # and retried on the next pass.
+            with contextlib.suppress(Exception):
+                self.flush()
+
+            # The thread stops once the buffer is
+            # empty, so it never keeps an idle
+            # manager alive. The next save starts
+            # another.
+            with self._lock:
+                if not self._pending:
+                    if self._flusher is threading.current_thread():
+                        self._flusher = None
+                    return
+
+
+_WRITE_BEHIND: "weakref.WeakSet[WriteBehindCacheManager]" = weakref.WeakSet()
+"""Write-behind managers to flush at exit."""
+
+
+@atexit.register
+def _flush_write_behind():
+    for manager in list(_WRITE_BEHIND):
+        with contextlib.suppress(Exception):
+            manager.flush()
+
+
+# --------------------------------------------- #
+# Async Cache Managers. Below are derivatives of
+# the managers above which implement the
+# `AsyncCacheManager` protocol. Managers which
+# touch the disc run their transactions in a
+# worker thread.
+# --------------------------------------------- #
+
+
+class AsyncMemoryCacheManager(MemoryCacheManager[td.GT],
+                              pt.AsyncCacheManager[td.GT]):
+    """
+    `MemoryCacheManager` usable from `asyncio`
+    code. Transactions never leave the event
+    loop.
+    """
+
+    async def afind(self, key: str, default=None):
+        return self.find(key, default)
+
+    async def asave(self, key: str, data: td.GT):
+        return self.save(key, data)
+
+
+class ThreadedAsyncCacheManager(pt.AsyncCacheManager[td.GT]):
+    """
+    Implements the `AsyncCacheManager` protocol by
+    running the blocking transactions of some
+    `CacheManager` in a worker thread.
+
+    WARNING: not meant to be used directly!
+    """
+
+    async def afind(self, key: str, default=None):
+        find = self.find  #type: ignore[attr-defined]
+        return await asyncio.to_thread(find, key, default)
+
+    async def asave(self, key: str, data: td.GT):
+        save = self.save  #type: ignore[attr-defined]
+        return await asyncio.to_thread(save, key, data)
+
+
+class AsyncFileCacheManager(ThreadedAsyncCacheManager[td.GT],
+                            FileCacheManager[td.GT]):
+    """`FileCacheManager` usable from `asyncio` code."""
+
+
+class AsyncLogCacheManager(ThreadedAsyncCacheManager[td.GT],
+                           LogCacheManager[td.GT]):
+    """`LogCacheManager` usable from `asyncio` code."""
+
+
+class AsyncSQLiteCacheManager(ThreadedAsyncCacheManager[td.GT],
+                              SQLiteCacheManager[td.GT]):
+    """`SQLiteCacheManager` usable from `asyncio` code."""
+
+
+class AsyncShelfCacheManager(ThreadedAsyncCacheManager[td.GT],
+                             ShelfCacheManager[td.GT]):
+    """`ShelfCacheManager` usable from `asyncio` code."""
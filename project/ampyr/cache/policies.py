@@ -0,0 +1,308 @@
+"""
+Eviction and admission policies for bounded
+in-memory caches. See `protocols.EvictionPolicy`.
+"""
+
+import collections
+
+from ampyr import protocols as pt, typedefs as td
+from ampyr.cache import sketches
+
+
+class LRUPolicy(pt.EvictionPolicy):
+    """Evicts the least recently used key."""
+
+    def __init__(self, capacity: td.Optional[int] = None):
+        self._order: collections.OrderedDict[str, None] = \
+            collections.OrderedDict()
+
+    def touch(self, key: str):
+        self._order.move_to_end(key)
+
+    def insert(self, key: str):
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+    def remove(self, key: str):
+        self._order.pop(key, None)
+
+    def victim(self) -> str:
+        return next(iter(self._order))
+
+    def evict(self) -> str:
+        return self._order.popitem(last=False)[0]
+
+
+class LFUPolicy(pt.EvictionPolicy):
+    """
+    Evicts the least frequently used key. Ties go
+    to the least recently used of them.
+    """
+
+    def __init__(self, capacity: td.Optional[int] = None):
+        self._counts: dict[str, int] = dict()
+        self._buckets: dict[int, collections.OrderedDict[str, None]] = \
+            collections.defaultdict(collections.OrderedDict)
+        self._lowest = 0
+
+    def touch(self, key: str):
+        count = self._counts[key]
+        self._unlink(key, count)
+        self._link(key, count + 1)
+
+        if self._lowest == count and count not in self._buckets:
+            self._lowest = count + 1
+
+    def insert(self, key: str):
+        if key in self._counts:
+            return self.touch(key)
+
+        self._link(key, 1)
+        self._lowest = 1
+
+    def remove(self, key: str):
+        if key in self._counts:
+            self._unlink(key, self._counts.pop(key))
+
+    def victim(self) -> str:
+        return next(iter(self._buckets[self._lowest_count()]))
+
+    def evict(self) -> str:
+        key = self.victim()
+        self.remove(key)
+        return key
+
+    def _link(self, key: str, count: int):
+        self._counts[key] = count
+        self._buckets[count][key] = None
+
+    def _lowest_count(self) -> int:
+        # Removals may empty the lowest bucket,
+        # in which case the next is searched for.
+        if not self._buckets.get(self._lowest):
+            self._lowest = min(c for c, b in self._buckets.items() if b)
+        return self._lowest
+
+    def _unlink(self, key: str, count: int):
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+
+
+class ARCPolicy(pt.EvictionPolicy):
+    """
+    Adaptive Replacement Cache. Balances keys seen
+    once against keys seen again, steered by
+    recently evicted keys of either kind.
+    """
+
+    capacity: int
+    """Number of entries held by the cache."""
+
+    target: float
+    """
+    Number of entries the keys seen once are
+    allowed to take up.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.target = 0.0
+
+        # Keys seen once, and keys seen again,
+        # which are stored. Then the ghosts of
+        # those recently evicted from each.
+        self._t1: collections.OrderedDict[str, None] = \
+            collections.OrderedDict()
+        self._t2: collections.OrderedDict[str, None] = \
+            collections.OrderedDict()
+        self._b1: collections.OrderedDict[str, None] = \
+            collections.OrderedDict()
+        self._b2: collections.OrderedDict[str, None] = \
+            collections.OrderedDict()
+        self._admitting: td.Optional[str] = None
+
+    def admit(self, key: str) -> bool:
+        # The target must follow a returning ghost
+        # before the victim making room for it is
+        # chosen.
+        self._adapt(key)
+        return True
+
+    def touch(self, key: str):
+        self._t1.pop(key, None)
+        self._t2[key] = None
+        self._t2.move_to_end(key)
+
+    def insert(self, key: str):
+        if key in self._t1 or key in self._t2:
+            return self.touch(key)
+
+        if key != self._admitting:
+            self._adapt(key)
+        self._admitting = None
+
+        if key in self._b1 or key in self._b2:
+            self._b1.pop(key, None)
+            self._b2.pop(key, None)
+            self._t2[key] = None
+        else:
+            self._t1[key] = None
+
+        # Ghosts are bounded by the capacity of
+        # the cache.
+        if len(self._t1) + len(self._b1) > self.capacity and self._b1:
+            self._b1.popitem(last=False)
+        while sum(map(len, (self._t1, self._t2, self._b1, self._b2))) \
+                > 2 * self.capacity and self._b2:
+            self._b2.popitem(last=False)
+
+    def remove(self, key: str):
+        for keys in (self._t1, self._t2, self._b1, self._b2):
+            keys.pop(key, None)
+
+    def victim(self) -> str:
+        return next(iter(self._source()))
+
+    def evict(self) -> str:
+        source = self._source()
+        key = source.popitem(last=False)[0]
+
+        ghosts = self._b1 if source is self._t1 else self._b2
+        ghosts[key] = None
+        return key
+
+    def _adapt(self, key: str):
+        """
+        Moves the target towards the list some
+        returning ghost was evicted from.
+        """
+
+        self._admitting = key
+        b1, b2 = len(self._b1), len(self._b2)
+        if key in self._b1:
+            self.target = min(self.capacity, self.target + max(b2 / b1, 1))
+        elif key in self._b2:
+            self.target = max(0.0, self.target - max(b1 / b2, 1))
+
+    def _source(self):
+        """List the next victim is taken from."""
+
+        t1 = len(self._t1)
+        if self._t1 and (t1 > self.target or not self._t2
+                         or t1 == self.target and self._admitting in self._b2):
+            return self._t1
+        return self._t2
+
+
+class TinyLFUPolicy(pt.EvictionPolicy):
+    """
+    Admits a new key into a full cache only if it
+    is estimated to be used more often than the
+    victim it would replace. Eviction itself is
+    left to some other policy.
+
+    Frequencies are estimated by a count-min
+    sketch which forgets over time.
+    """
+
+    policy: pt.EvictionPolicy
+    """Policy choosing the victims."""
+
+    sketch: sketches.CountMinSketch
+    """Estimates how often keys are used."""
+
+    def __init__(self,
+                 capacity: int,
+                 policy: td.Optional[pt.EvictionPolicy] = None):
+        self.policy = policy or LRUPolicy(capacity)
+        self.sketch = sketches.CountMinSketch(max(capacity * 4, 16),
+                                              sample_size=capacity * 10)
+        self._admitting: td.Optional[str] = None
+
+    def admit(self, key: str) -> bool:
+        self._admitting = key
+        estimate = self.sketch.add(key)
+        return estimate > self.sketch.estimate(self.policy.victim())
+
+    def touch(self, key: str):
+        self.sketch.add(key)
+        self.policy.touch(key)
+
+    def insert(self, key: str):
+        # Keys admitted into a full cache were
+        # counted when admitted.
+        if key != self._admitting:
+            self.sketch.add(key)
+        self._admitting = None
+        self.policy.insert(key)
+
+    def remove(self, key: str):
+        self.policy.remove(key)
+
+    def victim(self) -> str:
+        return self.policy.victim()
+
+    def evict(self) -> str:
+        return self.policy.evict()
+
+
+POLICIES: dict[str, td.Any] = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "arc": ARCPolicy,
+    "tinylfu": TinyLFUPolicy,
+}
+"""Policies which can be chosen by name."""
+
+
+def make_policy(name: str, capacity: td.Optional[int]) -> pt.EvictionPolicy:
+    """
+    Constructs the policy known by some name for
+    a cache holding `capacity` entries.
+    """
+
+    if name not in POLICIES:
+        raise ValueError(f"unknown eviction policy {name!r}.")
+    if capacity is None and name in ("arc", "tinylfu"):
+        raise ValueError(f"{name!r} policy needs a bounded cache.")
+
+    return POLICIES[name](capacity)
+
+
+def replay(trace: td.Iterable[str],
+           capacity: int,
+           policies: td.Optional[td.Iterable[str]] = None) -> dict[str, float]:
+    """
+    Plays a recorded trace of keys against a cache
+    of `capacity` entries under each policy.
+    Returns the hit ratio of each.
+    """
+
+    trace = list(trace)
+    ratios = dict()
+
+    for name in policies or POLICIES:
+        policy, hits = make_policy(name, capacity), 0
+        stored: set[str] = set()
+
+        for key in trace:
+            if key in stored:
+                policy.touch(key)
+                hits += 1
+                continue
+
+            # Room is made before the key is inserted,
+            # so it is never its own victim.
+            if len(stored) >= capacity:
+                if not policy.admit(key):
+                    continue
+                stored.discard(policy.evict())
+
+            stored.add(key)
+            policy.insert(key)
+
+        ratios[name] = hits / len(trace) if trace else 0.0
+
+    return ratios
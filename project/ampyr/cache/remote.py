@@ -0,0 +1,491 @@
+"""
+A small cache server, and the `CacheManager`
+which talks to it, so many hosts can share one
+cache without any outside dependency.
+
+Requests and responses are binary frames. Each
+starts with `REMOTE_HEADER` and is followed by a
+body framed with `tools.pack_record`. Clients
+may send many requests before reading any
+responses; they are answered in order.
+"""
+
+import asyncio, contextlib, json, os, queue, socket, struct
+import threading, time
+
+from ampyr import protocols as pt, typedefs as td
+from ampyr.cache import loaders, managers, stats, tools
+
+DEFAULT_REMOTE_ADDRESS = ("127.0.0.1", 7379)
+"""Default address a cache server listens on."""
+
+DEFAULT_POOL_SIZE = 4
+"""
+Default number of connections a remote cache
+manager keeps open.
+"""
+
+DEFAULT_PING_INTERVAL = 30.0
+"""
+Default number of seconds a pooled connection
+may sit idle before it is pinged.
+"""
+
+REMOTE_HEADER = struct.Struct(">BII")
+"""
+Header of every frame. Holds the opcode, or
+status, the number of records in the body and
+the length of the body.
+"""
+
+OP_PING = 1
+"""Asks the server whether it is alive."""
+
+OP_FIND = 2
+"""Looks up each key in the body."""
+
+OP_SAVE = 3
+"""Saves each record in the body."""
+
+OP_DELETE = 4
+"""Drops each key in the body."""
+
+OP_TAG = 5
+"""
+Links each key in the body to the tags in its
+data, a JSON array.
+"""
+
+OP_INVALIDATE_TAG = 6
+"""
+Drops the entries of each tag in the body.
+Answers with the number dropped for each.
+"""
+
+STATUS_OK = 0
+"""The request succeeded."""
+
+STATUS_ERROR = 1
+"""The request was not understood, or failed."""
+
+RemoteAddress = str | tuple[str, int]
+"""
+Path of a Unix socket, or a host and port to
+reach over TCP.
+"""
+
+
+def pack_frame(code: int, records: td.Iterable[bytes] = ()) -> bytes:
+    """
+    Renders a frame holding some packed records.
+    """
+
+    records = list(records)
+    body = b"".join(records)
+    return REMOTE_HEADER.pack(code, len(records), len(body)) + body
+
+
+def unpack_records(body: bytes):
+    """
+    Reads the records of some frame body as
+    pairs of keys and data. Data of tombstones is
+    `None`.
+    """
+
+    for flags, key, offset, length in tools.iter_records(body):
+        if flags & tools.RECORD_TOMBSTONE:
+            yield key, None
+        else:
+            yield key, tools.unpack_data(flags, body[offset:offset + length])
+
+
+class CacheServer:
+    """
+    Serves the entries of some `CacheManager` to
+    remote clients over TCP or a Unix socket.
+
+    Data is stored as the clients serialized it,
+    so the manager should not serialize it again.
+    """
+
+    address: RemoteAddress
+    """Address the server listens on."""
+
+    manager: pt.CacheManager
+    """Manager holding the served entries."""
+
+    def __init__(self,
+                 manager: td.Optional[pt.CacheManager] = None,
+                 *,
+                 address: td.Optional[RemoteAddress] = None):
+
+        self.manager = manager or managers.MemoryCacheManager()
+        self.address = address or DEFAULT_REMOTE_ADDRESS
+
+        self._server: td.Optional[asyncio.AbstractServer] = None
+        self._loop: td.Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """
+        Starts listening. Listening on port zero
+        picks a free port, stored in `address`.
+        """
+
+        self._loop = asyncio.get_running_loop()
+        if isinstance(self.address, str):
+            self._server = await asyncio.start_unix_server(
+                self._handle, self.address)
+        else:
+            self._server = await asyncio.start_server(self._handle,
+                                                      *self.address)
+            self.address = self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        """Serves clients until closed."""
+
+        if self._server is None:
+            await self.start()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._server.serve_forever()  #type: ignore[union-attr]
+
+    def serve_in_thread(self) -> threading.Thread:
+        """
+        Serves clients from a daemon thread. Returns
+        once the server is listening.
+        """
+
+        started = threading.Event()
+
+        async def run():
+            await self.start()
+            started.set()
+            await self.serve_forever()
+
+        thread = threading.Thread(target=asyncio.run,
+                                  args=(run(), ),
+                                  name="ampyr-cache-server",
+                                  daemon=True)
+        thread.start()
+        started.wait()
+        return thread
+
+    def close(self):
+        """Stops listening for clients."""
+
+        if self._server is None or self._loop is None:
+            return
+
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._server.close)
+        else:
+            self._server.close()
+
+        if isinstance(self.address, str):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.address)
+
+    def dispatch(self, code: int, body: bytes) -> bytes:
+        """Answers a single request frame."""
+
+        if code == OP_PING:
+            return pack_frame(STATUS_OK)
+
+        if code == OP_FIND:
+            records = []
+            for key, _ in unpack_records(body):
+                found = self.manager.find(key, tools.MISSING)
+                if found is tools.MISSING:
+                    found = None
+                records.append(tools.pack_record(key, found))
+            return pack_frame(STATUS_OK, records)
+
+        if code == OP_SAVE:
+            mapping = {k: v for k, v in unpack_records(body) if v is not None}
+            self.manager.save_many(mapping)
+            return pack_frame(STATUS_OK)
+
+        if code == OP_DELETE:
+            keys = [key for key, _ in unpack_records(body)]
+            self.manager.invalidate_many(keys)  #type: ignore[attr-defined]
+            return pack_frame(STATUS_OK)
+
+        if code == OP_TAG:
+            for key, tags in unpack_records(body):
+                self.manager._tag(  #type: ignore[attr-defined]
+                    (key, ), json.loads(tags or "[]"))
+            return pack_frame(STATUS_OK)
+
+        if code == OP_INVALIDATE_TAG:
+            records = []
+            for tag, _ in unpack_records(body):
+                dropped = self.manager.invalidate_tag(  #type: ignore[attr-defined]
+                    tag)
+                records.append(tools.pack_record(tag, str(dropped)))
+            return pack_frame(STATUS_OK, records)
+
+        return pack_frame(STATUS_ERROR)
+
+    async def _handle(self, reader: asyncio.StreamReader,
+                      writer: asyncio.StreamWriter):
+        try:
+            while True:
+                header = await reader.readexactly(REMOTE_HEADER.size)
+                code, _, length = REMOTE_HEADER.unpack(header)
+                body = await reader.readexactly(length)
+
+                # Managers may block on the disc, so
+                # other clients are served meanwhile.
+                try:
+                    response = await asyncio.to_thread(self.dispatch, code,
+                                                       body)
+                except Exception:
+                    response = pack_frame(STATUS_ERROR)
+
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class _Connection:
+    """A pooled socket connected to a cache server."""
+
+    def __init__(self, address: RemoteAddress, timeout: float):
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(address)
+        else:
+            self.sock = socket.create_connection(address, timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.reader = self.sock.makefile("rb")
+        self.last_used = time.monotonic()
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def request(self, frames: td.Sequence[bytes]) -> list[tuple[int, bytes]]:
+        """
+        Sends every frame before reading any of the
+        responses.
+        """
+
+        self.sock.sendall(b"".join(frames))
+
+        responses = []
+        for _ in frames:
+            header = self.reader.read(REMOTE_HEADER.size)
+            if len(header) < REMOTE_HEADER.size:
+                raise ConnectionError("cache server closed the connection.")
+
+            code, _, length = REMOTE_HEADER.unpack(header)
+            body = self.reader.read(length)
+            if len(body) < length:
+                raise ConnectionError("cache server closed the connection.")
+            responses.append((code, body))
+
+        self.last_used = time.monotonic()
+        return responses
+
+
+class RemoteCacheManager(managers.SimpleCacheManager[td.GT],
+                         pt.RemoteAccessManager):
+    """
+    Brokers data to/from a `CacheServer`.
+
+    Connections are kept in a pool and reused.
+    Connections left idle past `ping_interval`
+    are pinged before use, and replaced if the
+    server does not answer.
+
+    Tags are kept by the server, so entries
+    saved by one client can be invalidated by
+    any other.
+    """
+
+    serializer: pt.SupportsSerialize[td.GT] = json  #type: ignore[assignment]
+
+    address: RemoteAddress
+    """Address of the cache server."""
+
+    pool_size: int
+    """Maximum number of idle connections kept."""
+
+    ping_interval: float
+    """
+    Seconds a connection may sit idle before it
+    is checked with a ping.
+    """
+
+    timeout: float
+    """Seconds to wait on the server."""
+
+    def __init__(self,
+                 address: td.Optional[RemoteAddress] = None,
+                 *,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 ping_interval: float = DEFAULT_PING_INTERVAL,
+                 timeout: float = 5.0,
+                 serializer: td.Optional[pt.SupportsSerialize] = None,
+                 sub_ids: td.Optional[tuple[td.StrOrBytes, ...]] = None):
+
+        super().__init__(serializer=serializer, sub_ids=sub_ids)
+
+        self.address = address or DEFAULT_REMOTE_ADDRESS
+        self.pool_size = pool_size
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+
+        self._pool: queue.LifoQueue[_Connection] = queue.LifoQueue()
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, etype, evalue, tback):
+        self.detach()
+
+    def attach(self):
+        """
+        Opens a connection to the server, if none
+        is pooled yet.
+        """
+
+        return self.ping()
+
+    def detach(self):
+        """Closes every pooled connection."""
+
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return td.ReturnState.SUCCESS
+
+    def ping(self):
+        """Whether the server answers a ping."""
+
+        try:
+            self._request([pack_frame(OP_PING)])
+        except OSError:
+            return td.ReturnState.FAILURE
+        return td.ReturnState.SUCCESS
+
+    @stats.record_find
+    def find(self, key: str, default=None):
+        return self._find_many([key]).get(key, default)
+
+    @tools.record_tags
+    @stats.record_save
+    def save(self, key: str, data: td.GT):
+        self._submit(OP_SAVE, [self._pack(key, data)])
+        return data
+
+    @stats.record_find_many
+    def find_many(self, keys: td.Iterable[str]):
+        return self._find_many(keys)
+
+    @tools.record_tags_many
+    @stats.record_save_many
+    def save_many(self, mapping: dict[str, td.GT]):
+        records = [self._pack(k, v) for k, v in mapping.items()]
+        if records:
+            self._submit(OP_SAVE, records)
+        return mapping
+
+    def invalidate_tag(self, tag: str) -> int:
+        body = self._submit(OP_INVALIDATE_TAG, [tools.pack_record(tag, b"")])
+        return sum(int(dropped) for _, dropped in unpack_records(body))
+
+    def pipeline(self, frames: td.Sequence[bytes]) -> list[tuple[int, bytes]]:
+        """
+        Sends many request frames, made with
+        `pack_frame`, in one round trip. Returns the
+        status and body of each response.
+        """
+
+        return self._request(frames)
+
+    def _find_many(self, keys: td.Iterable[str]):
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return dict()
+
+        body = self._submit(OP_FIND, [tools.pack_record(k, b"") for k in keys])
+        return {
+            key: loaders.load(self.serializer, found)
+            for key, found in unpack_records(body) if found is not None
+        }
+
+    @contextlib.contextmanager
+    def _connection(self):
+        """
+        Borrows a healthy connection from the pool,
+        opening one if none is idle.
+        """
+
+        conn = None
+        while conn is None:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = _Connection(self.address, self.timeout)
+                break
+
+            if time.monotonic() - conn.last_used > self.ping_interval:
+                try:
+                    conn.request([pack_frame(OP_PING)])
+                except OSError:
+                    conn.close()
+                    conn = None
+
+        try:
+            yield conn
+        except BaseException:
+            # The state of the stream is unknown, so
+            # the connection is dropped.
+            conn.close()
+            raise
+
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def _pack(self, key: str, data: td.GT) -> bytes:
+        return tools.pack_record(key, self._dump(data))
+
+    def _remove(self, keys: td.Sequence[str]):
+        if keys:
+            self._submit(OP_DELETE, [tools.pack_record(k, b"") for k in keys])
+
+    def _request(self, frames: td.Sequence[bytes]):
+        with self._connection() as conn:
+            return conn.request(frames)
+
+    def _submit(self, code: int, records: td.Iterable[bytes]) -> bytes:
+        """
+        Sends a single request and returns the body
+        of its response. Raises `ConnectionError`
+        if the server did not answer `STATUS_OK`.
+        """
+
+        (status, body), = self._request([pack_frame(code, records)])
+        if status != STATUS_OK:
+            raise ConnectionError(f"cache server answered {status}.")
+        return body
+
+    def _tag(self, keys: td.Iterable[str], tags: td.Iterable[str]):
+        encoded = json.dumps(list(tags))
+        records = [tools.pack_record(k, encoded) for k in keys]
+        if records:
+            self._submit(OP_TAG, records)
+
+    def _untag(self, keys: td.Iterable[str]):
+        # The server unlinks the tags of the keys
+        # it drops.
+        pass
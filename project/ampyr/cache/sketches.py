@@ -0,0 +1,207 @@
+"""
+Compact, probabilistic summaries of the keys
+seen by some cache.
+"""
+
+import array, hashlib, math, random, struct
+
+from ampyr import typedefs as td
+
+BLOOM_MAGIC = b"AMPB"
+"""Leading bytes of every dumped Bloom filter."""
+
+BLOOM_HEADER = struct.Struct(">4sQQQdB")
+"""
+Header of a dumped Bloom filter. Holds the magic
+bytes, the capacity, the number of keys added,
+the number of bits, the error rate and the
+number of hashes.
+"""
+
+
+class CountMinSketch:
+    """
+    Estimates how often each key was added using
+    `depth` rows of `width` counters. Estimates
+    may be too high, never too low.
+
+    Once `sample_size` keys have been added every
+    counter is halved, so old popularity fades.
+    """
+
+    width: int
+    """Number of counters in each row."""
+
+    depth: int
+    """Number of rows, each hashed differently."""
+
+    sample_size: td.Optional[int]
+    """
+    Number of additions after which counters are
+    halved. `None` never halves them.
+    """
+
+    def __init__(self,
+                 width: int,
+                 depth: int = 4,
+                 *,
+                 sample_size: td.Optional[int] = None):
+
+        if width < 1 or depth < 1:
+            raise ValueError("a sketch needs at least one counter.")
+
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size
+
+        self._rows = [array.array("I", bytes(4 * width)) for _ in range(depth)]
+        self._added = 0
+
+        # Each row multiplies the hash of a key by
+        # its own odd factor, so keys sharing a
+        # counter in one row rarely share them all.
+        factors = random.Random(depth)
+        self._factors = [factors.getrandbits(64) | 1 for _ in range(depth)]
+
+    def add(self, key: td.Any) -> int:
+        """
+        Counts a key once. Returns its new
+        estimate.
+        """
+
+        counts = []
+        for row, index in self._locate(key):
+            if row[index] < 0xFFFFFFFF:
+                row[index] += 1
+            counts.append(row[index])
+
+        self._added += 1
+        if self.sample_size and self._added >= self.sample_size:
+            self.halve()
+
+        return min(counts)
+
+    def estimate(self, key: td.Any) -> int:
+        """How often a key was added, at most."""
+
+        return min(row[index] for row, index in self._locate(key))
+
+    def halve(self):
+        """Halves every counter."""
+
+        for row in self._rows:
+            for index, count in enumerate(row):
+                if count:
+                    row[index] = count >> 1
+        self._added //= 2
+
+    def reset(self):
+        """Sets every counter back to zero."""
+
+        for row in self._rows:
+            row[:] = array.array("I", bytes(4 * self.width))
+        self._added = 0
+
+    def _locate(self, key: td.Any):
+        """Counter of each row a key is counted by."""
+
+        khash = hash(key) & 0xFFFFFFFFFFFFFFFF
+        for factor, row in zip(self._factors, self._rows):
+            index = ((khash * factor) & 0xFFFFFFFFFFFFFFFF) >> 32
+            yield row, index % self.width
+
+
+class BloomFilter:
+    """
+    Remembers a set of keys in a fixed number of
+    bits. Tells for certain when a key was never
+    added, but may wrongly claim one was, at
+    around `error_rate` once `capacity` keys are
+    added.
+
+    Keys are hashed the same way by every
+    process, so filters can be dumped and loaded.
+    """
+
+    capacity: int
+    """Number of keys the filter is sized for."""
+
+    error_rate: float
+    """
+    Rate of false positives expected at
+    `capacity`.
+    """
+
+    count: int
+    """Number of keys added."""
+
+    size: int
+    """Number of bits in the filter."""
+
+    hashes: int
+    """Number of bits set for each key."""
+
+    @property
+    def overfull(self):
+        """
+        Whether more keys were added than the filter
+        was sized for.
+        """
+
+        return self.count > self.capacity
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.count = 0
+
+        self.size = max(
+            int(-self.capacity * math.log(error_rate) / math.log(2)**2), 8)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self._bits = bytearray(-(-self.size // 8))
+
+    def __contains__(self, key: str | bytes) -> bool:
+        bits = self._bits
+        return all(bits[i >> 3] & (1 << (i & 7)) for i in self._locate(key))
+
+    def add(self, key: str | bytes):
+        """Remembers some key."""
+
+        for i in self._locate(key):
+            self._bits[i >> 3] |= 1 << (i & 7)
+        self.count += 1
+
+    def dumps(self) -> bytes:
+        """Renders this filter as bytes."""
+
+        return BLOOM_HEADER.pack(BLOOM_MAGIC, self.capacity, self.count,
+                                 self.size, self.error_rate,
+                                 self.hashes) + bytes(self._bits)
+
+    @classmethod
+    def loads(cls, data: bytes):
+        """Restores a filter rendered by `dumps`."""
+
+        magic, capacity, count, size, error_rate, hashes = \
+            BLOOM_HEADER.unpack_from(data)
+        bits = data[BLOOM_HEADER.size:]
+        if magic != BLOOM_MAGIC or len(bits) != -(-size // 8):
+            raise ValueError("data is not a dumped Bloom filter.")
+
+        inst = cls.__new__(cls)
+        inst.capacity, inst.count, inst.size = capacity, count, size
+        inst.error_rate, inst.hashes = error_rate, hashes
+        inst._bits = bytearray(bits)
+        return inst
+
+    def _locate(self, key: str | bytes):
+        """Bits set for some key."""
+
+        if isinstance(key, str):
+            key = key.encode()
+
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
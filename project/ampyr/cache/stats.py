@@ -0,0 +1,275 @@
+"""
+Counters and latency histograms describing how
+some cache is used. Collection is cheap and can
+be switched off per object.
+"""
+
+import functools, threading, time
+
+from ampyr import factories as ft, typedefs as td
+
+DEFAULT_ENABLED = True
+"""
+Whether new `CacheStats` objects collect data
+unless told otherwise.
+"""
+
+_MISSING = object()
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies in nanoseconds. Each
+    bucket counts samples up to twice the bound
+    of the bucket before it.
+    """
+
+    count: int
+    """Number of samples recorded."""
+
+    total: int
+    """Sum of every sample recorded."""
+
+    maximum: int
+    """Largest sample recorded."""
+
+    def __init__(self):
+        self.reset()
+
+    def percentile(self, q: float) -> int:
+        """
+        Upper bound, in nanoseconds, of the bucket
+        holding the `q`th percentile.
+        """
+
+        if not self.count:
+            return 0
+
+        rank, seen = q / 100 * self.count, 0
+        for bucket, count in enumerate(self._buckets):
+            seen += count
+            if seen >= rank:
+                return min((1 << bucket) - 1, self.maximum)
+        return self.maximum
+
+    def record(self, nanoseconds: int):
+        """Adds a sample to this histogram."""
+
+        self._buckets[min(nanoseconds.bit_length(), 63)] += 1
+        self.count += 1
+        self.total += nanoseconds
+        if nanoseconds > self.maximum:
+            self.maximum = nanoseconds
+
+    def reset(self):
+        """Drops every sample recorded."""
+
+        self._buckets = [0] * 64
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    def snapshot(self) -> dict[str, td.Any]:
+        """
+        Renders the state of this histogram as a
+        dictionary.
+        """
+
+        buckets = {(1 << i) - 1: c for i, c in enumerate(self._buckets) if c}
+        return dict(count=self.count,
+                    mean=self.total // self.count if self.count else 0,
+                    maximum=self.maximum,
+                    p50=self.percentile(50),
+                    p99=self.percentile(99),
+                    buckets=buckets)
+
+
+class CacheStats:
+    """
+    Counts the transactions of some cache and
+    records their latencies.
+    """
+
+    enabled: bool
+    """Whether data is being collected."""
+
+    hits: int
+    """Number of lookups which found data."""
+
+    misses: int
+    """Number of lookups which found nothing."""
+
+    saves: int
+    """Number of entries saved."""
+
+    evictions: int
+    """Number of entries evicted."""
+
+    bytes_saved: int
+    """
+    Total size, in bytes, of data saved. Only
+    ever grows; entries dropped later are not
+    taken off.
+    """
+
+    find_latency: LatencyHistogram
+    """Latencies of lookups."""
+
+    save_latency: LatencyHistogram
+    """Latencies of saves."""
+
+    @property
+    def hit_ratio(self):
+        """Fraction of lookups which found data."""
+
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __init__(self, *, enabled: td.Optional[bool] = None):
+        self.enabled = DEFAULT_ENABLED if enabled is None else enabled
+
+        self.find_latency = LatencyHistogram()
+        self.save_latency = LatencyHistogram()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record_bytes(self, size: int):
+        """Counts serialized data being saved."""
+
+        if self.enabled:
+            with self._lock:
+                self.bytes_saved += size
+
+    def record_evictions(self, count: int = 1):
+        """Counts entries being evicted."""
+
+        if self.enabled:
+            with self._lock:
+                self.evictions += count
+
+    def record_find(self, hits: int, misses: int, nanoseconds: int):
+        """Counts a lookup, or batch of lookups."""
+
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.find_latency.record(nanoseconds)
+
+    def record_save(self, saves: int, nanoseconds: int):
+        """Counts a save, or batch of saves."""
+
+        with self._lock:
+            self.saves += saves
+            self.save_latency.record(nanoseconds)
+
+    def reset(self):
+        """Sets every counter back to zero."""
+
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.saves = 0
+            self.evictions = 0
+            self.bytes_saved = 0
+            self.find_latency.reset()
+            self.save_latency.reset()
+
+    def snapshot(self) -> dict[str, td.Any]:
+        """
+        Renders the state of these stats as a
+        dictionary.
+        """
+
+        with self._lock:
+            return dict(hits=self.hits,
+                        misses=self.misses,
+                        hit_ratio=self.hit_ratio,
+                        saves=self.saves,
+                        evictions=self.evictions,
+                        bytes_saved=self.bytes_saved,
+                        find_latency=self.find_latency.snapshot(),
+                        save_latency=self.save_latency.snapshot())
+
+
+def record_find(method: ft.Callable) -> ft.Callable:
+    """
+    Wraps the `find` method of some manager so it
+    is counted by the manager's `stats`.
+    """
+
+    @functools.wraps(method)
+    def inner(self, key: str, default=None):
+        if not self.stats.enabled:
+            return method(self, key, default)
+
+        start = time.perf_counter_ns()
+        found = method(self, key, _MISSING)
+        hit = found is not _MISSING
+        self.stats.record_find(hit, not hit, time.perf_counter_ns() - start)
+
+        return found if hit else default
+
+    return inner
+
+
+def record_find_many(method: ft.Callable) -> ft.Callable:
+    """
+    Wraps the `find_many` method of some manager
+    so it is counted by the manager's `stats`.
+    """
+
+    @functools.wraps(method)
+    def inner(self, keys: td.Iterable[str]):
+        if not self.stats.enabled:
+            return method(self, keys)
+
+        keys = list(keys)
+        start = time.perf_counter_ns()
+        found = method(self, keys)
+        self.stats.record_find(len(found),
+                               len(set(keys)) - len(found),
+                               time.perf_counter_ns() - start)
+
+        return found
+
+    return inner
+
+
+def record_save(method: ft.Callable) -> ft.Callable:
+    """
+    Wraps the `save` method of some manager so it
+    is counted by the manager's `stats`.
+    """
+
+    @functools.wraps(method)
+    def inner(self, key: str, data, *args, **kwds):
+        if not self.stats.enabled:
+            return method(self, key, data, *args, **kwds)
+
+        start = time.perf_counter_ns()
+        data = method(self, key, data, *args, **kwds)
+        self.stats.record_save(1, time.perf_counter_ns() - start)
+
+        return data
+
+    return inner
+
+
+def record_save_many(method: ft.Callable) -> ft.Callable:
+    """
+    Wraps the `save_many` method of some manager
+    so it is counted by the manager's `stats`.
+    """
+
+    @functools.wraps(method)
+    def inner(self, mapping: dict, *args, **kwds):
+        if not self.stats.enabled:
+            return method(self, mapping, *args, **kwds)
+
+        start = time.perf_counter_ns()
+        mapping = method(self, mapping, *args, **kwds)
+        self.stats.record_save(len(mapping), time.perf_counter_ns() - start)
+
+        return mapping
+
+    return inner
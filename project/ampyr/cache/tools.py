@@ -1,6 +1,10 @@
-import functools, inspect
+import asyncio, collections, contextlib, functools, hashlib, inspect, json
+import mmap, os, stat, struct, sys, tempfile, threading, time, types, typing
+from collections import abc
+from concurrent import futures
 
-from ampyr import factories as ft, protocols as pt, typedefs as td
+from ampyr import errors, factories as ft, protocols as pt, typedefs as td
+from ampyr.cache import loaders, stats
 
 # Temporary Paramspec. Must be local in order to
 # function properly.
@@ -11,6 +15,78 @@ DEFAULT_CACHE_PATH = ".cache"
 Default filename used for local cache files.
 """
 
+DEFAULT_MAX_ENTRIES = 1024
+"""
+Default number of entries an in-memory cache
+holds before evicting.
+"""
+
+KEY_PART_LIMIT = 64
+"""
+Length past which an encoded part of a search key
+is replaced by its digest.
+"""
+
+DEFAULT_SHARDS = 16
+"""
+Default number of independently locked shards
+a sharded in-memory cache is split into.
+"""
+
+DEFAULT_BLOOM_CAPACITY = 10_000
+"""
+Default number of keys the Bloom filter of a disc
+cache is first sized for.
+"""
+
+DEFAULT_WRITE_BUFFER = 256
+"""
+Default number of saves buffered by a
+write-behind cache before they are written out.
+"""
+
+DEFAULT_VNODES = 64
+"""
+Default number of points each node is given on
+a consistent hash ring.
+"""
+
+DEFAULT_HEALTH_INTERVAL = 5.0
+"""
+Default number of seconds the result of a node
+health check is trusted.
+"""
+
+DEFAULT_REFRESH_WORKERS = 4
+"""
+Default number of threads refreshing stale cache
+entries in the background.
+"""
+
+DEFAULT_L1_ENTRIES = 256
+"""
+Default number of entries held by the memory tier
+of a tiered cache.
+"""
+
+
+class _Missing:
+    """Type of the `MISSING` sentinel."""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING: td.Any = _Missing()
+"""
+Sentinel returned by `CacheManager.find` in place
+of a `default` to report a miss. Unlike `None`,
+it is never a cached value.
+"""
+
 
 def get_cache_path(path: td.OptFilePath = None,
                    *ids: str | None) -> td.FilePath:
@@ -31,74 +107,1254 @@ def get_cache_path(path: td.OptFilePath = None,
     return path
 
 
+def get_runtime_path(name: str) -> str:
+    """
+    Path to some file in a directory private to
+    the current user, for files which have no
+    data location to sit next to. The directory
+    is created when missing.
+    """
+
+    uid = os.getuid()
+    root = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    directory = os.path.join(root, f"ampyr-{uid}")
+    with contextlib.suppress(FileExistsError):
+        os.mkdir(directory, 0o700)
+
+    # Some other user may have made the
+    # directory first, or left a link in its
+    # place.
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != uid \
+            or info.st_mode & 0o077:
+        raise PermissionError(f"{directory!r} is not private to this user.")
+
+    return os.path.join(directory, name)
+
+
 def get_generic_key(obj: pt.HasCacheHandler, *ids):
     """
     Constructs a string that can be used as a
     search key for any relevant cache data.
     """
 
-    typename, baseids = type(obj).__name__, []
+    typename = type(obj).__name__
+    return "<{}={}>".format(typename, "-".join(map(encode_key_part, ids)))
+
+
+def encode_key_part(obj) -> str:
+    """
+    Renders some object as a stable string for
+    use in a search key. Mappings and sets are
+    put in sorted order, and parts longer than
+    `KEY_PART_LIMIT` are replaced by their
+    digest.
+    """
+
+    encoder = _KEY_ENCODERS.get(type(obj), None)
+
+    if encoder:
+        part = encoder(obj)
+    elif isinstance(obj, type):
+        part = qualified_name(obj)
+    elif isinstance(obj, abc.Mapping):
+        part = _encode_mapping(obj)
+    elif isinstance(obj, abc.Set):
+        part = _encode_set(obj)
+    elif isinstance(obj, (list, tuple)):
+        part = _encode_sequence(obj)
+    elif hasattr(obj, "__name__"):
+        part = obj.__name__
+    else:
+        part = repr(obj)
+
+    if len(part) > KEY_PART_LIMIT:
+        part = "#" + make_digest(part)
+    return part
+
+
+def qualified_name(obj) -> str:
+    """
+    Renders the name of some class or function
+    along with the module it was defined in.
+    """
+
+    return f"{obj.__module__}.{obj.__qualname__}"
+
+
+def make_digest(key: str) -> str:
+    """
+    Renders a fixed size digest of some search
+    key.
+    """
+
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def _encode_mapping(obj: abc.Mapping) -> str:
+    items = sorted(": ".join(map(encode_key_part, i)) for i in obj.items())
+    return "{" + ", ".join(items) + "}"
+
 
-    for i in ids:
-        if hasattr(i, "__name__"):
-            baseids.append(i.__name__)
-            continue
-        baseids.append("('{}')".format(i))
+def _encode_sequence(obj: list | tuple) -> str:
+    return "[" + ", ".join(map(encode_key_part, obj)) + "]"
 
-    return "<{}={}>".format(typename, "-".join(baseids))
 
+def _encode_set(obj: abc.Set) -> str:
+    return "{" + ", ".join(sorted(map(encode_key_part, obj))) + "}"
 
-def build_keypair(join_char: str, key: str, data: str):
+
+_KEY_ENCODERS: dict[type, ft.Callable[[td.Any], str]] = {
+    type(None): repr,
+    bool: repr,
+    int: repr,
+    float: repr,
+    str: repr,
+    bytes: repr,
+    dict: _encode_mapping,
+    list: _encode_sequence,
+    tuple: _encode_sequence,
+    set: _encode_set,
+    frozenset: _encode_set,
+}
+
+_POSITIONAL_KINDS = (inspect.Parameter.POSITIONAL_ONLY,
+                     inspect.Parameter.POSITIONAL_OR_KEYWORD)
+
+
+class KeyBuilder:
+    """
+    Builds search keys for calls to some
+    function. The function's signature is bound
+    once, when the builder is constructed.
+    """
+
+    digest: bool
+    """
+    Whether keys are reduced to a fixed size
+    digest.
+    """
+
+    name: str
+    """
+    Qualified name of the target function,
+    including its module.
+    """
+
+    signature: inspect.Signature
+    """Signature of the target function."""
+
+    def __init__(self, func: ft.Callable, *, digest: bool = False):
+        self.digest = digest
+        self.name = qualified_name(func)
+        self.signature = inspect.signature(func)
+
+        params = list(self.signature.parameters.values())
+        positional = [p for p in params if p.kind in _POSITIONAL_KINDS]
+
+        self._names = tuple(p.name for p in positional)
+        self._defaults = tuple(p.default for p in positional)
+        self._required = sum(p.default is p.empty for p in positional)
+
+        # Calls may skip binding altogether when
+        # every parameter can be given by
+        # position.
+        self._simple = len(positional) == len(params)
+        self._has_self = bool(positional) and positional[0].name == "self"
+
+    def __call__(self, args: tuple, kwds: dict) -> str:
+        if (self._simple and not kwds
+                and self._required <= len(args) <= len(self._names)):
+            values = args + self._defaults[len(args):]
+            pairs = zip(self._names, values)
+        else:
+            bound = self.signature.bind(*args, **kwds)
+            bound.apply_defaults()
+            pairs = bound.arguments.items()  #type: ignore[assignment]
+
+        parts: list[str] = []
+        for name, value in pairs:
+            # Ensure signature is not unique to a
+            # parent instance.
+            if self._has_self and not parts:
+                value = type(value)
+            parts.append("=".join([name, encode_key_part(value)]))
+
+        key = "{}({})".format(self.name, ", ".join(parts))
+        if self.digest:
+            return "#".join([self.name, make_digest(key)])
+        return key
+
+
+class TagIndex:
+    """
+    Reverse index of tags to the keys saved with
+    them. Lookups and removals only touch the
+    keys of the tag concerned.
+    """
+
+    def __init__(self):
+        self._keys: dict[str, set[str]] = dict()
+        self._tags: dict[str, tuple[str, ...]] = dict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, tag: str) -> bool:
+        return tag in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key: str, tags: td.Iterable[str]):
+        """
+        Links some key to the given tags, replacing
+        any it was linked to before.
+        """
+
+        tags = tuple(dict.fromkeys(tags))
+        if not tags and key not in self._tags:
+            return
+
+        with self._lock:
+            self._unlink(key, self._tags.pop(key, ()))
+            if not tags:
+                return
+
+            self._tags[key] = tags
+            for tag in tags:
+                self._keys.setdefault(tag, set()).add(key)
+
+    def close(self):
+        """Releases what this index holds open."""
+
+    def discard(self, key: str):
+        """Unlinks some key from all of its tags."""
+
+        if key not in self._tags:
+            return
+
+        with self._lock:
+            self._unlink(key, self._tags.pop(key, ()))
+
+    def keys(self, tag: str) -> set[str]:
+        """Keys linked to some tag."""
+
+        with self._lock:
+            return set(self._keys.get(tag, ()))
+
+    def pop(self, tag: str) -> set[str]:
+        """
+        Forgets some tag, unlinking its keys from
+        every tag. Returns the keys.
+        """
+
+        with self._lock:
+            keys = self._keys.pop(tag, set())
+            for key in keys:
+                self._unlink(key, self._tags.pop(key, ()))
+            return keys
+
+    def tags(self, key: str) -> tuple[str, ...]:
+        """Tags some key is linked to."""
+
+        return self._tags.get(key, ())
+
+    def _unlink(self, key: str, tags: td.Iterable[str]):
+        """
+        Removes some key from the given tags. The
+        lock must be held.
+        """
+
+        for tag in tags:
+            keys = self._keys.get(tag)
+            if keys is None:
+                continue
+
+            keys.discard(key)
+            if not keys:
+                del self._keys[tag]
+
+
+def record_tags(method: ft.Callable) -> ft.Callable:
+    """
+    Wraps the `save` method of some manager so it
+    accepts `tags` to link the key to. Given no
+    `tags`, the key keeps those it has.
+    """
+
+    @functools.wraps(method)
+    def inner(self, key: str, data, *args, tags=None, **kwds):
+        data = method(self, key, data, *args, **kwds)
+        if tags is not None:
+            self._tag((key, ), tags)
+        return data
+
+    return inner
+
+
+def record_tags_many(method: ft.Callable) -> ft.Callable:
+    """
+    Wraps the `save_many` method of some manager
+    so it accepts `tags` to link every key to.
+    Given no `tags`, keys keep those they have.
+    """
+
+    @functools.wraps(method)
+    def inner(self, mapping: dict, *args, tags=None, **kwds):
+        mapping = method(self, mapping, *args, **kwds)
+        if tags is not None:
+            self._tag(mapping, tags)
+        return mapping
+
+    return inner
+
+
+def freeze(obj):
+    """
+    Renders an immutable view of some object.
+    Dicts become read-only mappings, lists become
+    tuples and sets become frozensets, all the
+    way down.
+    """
+
+    if isinstance(obj, dict):
+        return types.MappingProxyType({k: freeze(v) for k, v in obj.items()})
+    if isinstance(obj, (list, tuple)):
+        return tuple(freeze(i) for i in obj)
+    if isinstance(obj, set):
+        return frozenset(freeze(i) for i in obj)
+    if isinstance(obj, bytearray):
+        return bytes(obj)
+    return obj
+
+
+def sizeof(obj) -> int:
+    """
+    Size, in bytes, of some stored data. Raw data
+    is measured by its length. Objects are
+    estimated from their size in memory, all the
+    way down.
+    """
+
+    if isinstance(obj, (str, bytes, bytearray)):
+        return len(obj)
+    return _deep_sizeof(obj, set())
+
+
+def _deep_sizeof(obj, seen: set[int]) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (dict, types.MappingProxyType)):
+        size += sum(
+            _deep_sizeof(k, seen) + _deep_sizeof(v, seen)
+            for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(i, seen) for i in obj)
+    return size
+
+
+class ByteBudget:
+    """
+    Tracks the total size of the entries held by
+    some cache against an optional limit.
+    """
+
+    limit: td.Optional[int]
+    """
+    Number of bytes the entries may take up.
+    `None` means unbounded.
+    """
+
+    usage: int
+    """Number of bytes the entries take up."""
+
+    @property
+    def exceeded(self):
+        """Whether the entries no longer fit."""
+
+        return self.limit is not None and self.usage > self.limit
+
+    def __init__(self, limit: td.Optional[int] = None):
+        self.limit = limit
+        self.usage = 0
+        self._lock = threading.Lock()
+
+    def charge(self, size: int):
+        """
+        Counts some bytes being stored, or released
+        when negative.
+        """
+
+        with self._lock:
+            self.usage += size
+
+    def fits(self, size: int) -> bool:
+        """Whether an entry could fit at all."""
+
+        return self.limit is None or size <= self.limit
+
+
+@typing.overload
+def build_keypair(join_char: str, key: str, data: str) -> str:
+    ...
+
+
+@typing.overload
+def build_keypair(join_char: bytes, key: bytes, data: bytes) -> bytes:
+    ...
+
+
+def build_keypair(join_char, key, data):
     """
     Renders the concatenation of some search key
-    and the data related to it.
+    and the data related to it. Either every
+    part is a string, or every part is bytes.
     """
 
     return join_char.join([key, data])
 
 
-def split_keypair(join_char: str, keypair: str):
+@typing.overload
+def split_keypair(join_char: str, keypair: str) -> list[str]:
+    ...
+
+
+@typing.overload
+def split_keypair(join_char: bytes, keypair: bytes) -> list[bytes]:
+    ...
+
+
+def split_keypair(join_char, keypair):
     """
     From the given `join_char`, divide a
-    `keypair` string into its individual
-    components.
+    `keypair` string, or bytes, into its
+    individual components.
     """
 
     return keypair.split(join_char, maxsplit=1)
 
 
-def cachemethod(func: ft.Callable[_PS, td.GT]) -> ft.Callable[_PS, td.GT]:
+RECORD_HEADER = struct.Struct(">BII")
+"""
+Header prefixed to every binary record. Holds the
+record flags, the key length and the data length.
+"""
+
+RECORD_TOMBSTONE = 0x01
+"""Flag marking a record as deleted."""
+
+RECORD_TEXT = 0x02
+"""Flag marking record data as UTF-8 text."""
+
+LOG_MAGIC = b"AMPL"
+"""Leading bytes of every record log."""
+
+LOG_HEADER = struct.Struct(">4sHxx")
+"""
+Header of a record log. Holds the magic bytes
+and the format version. Records follow.
+"""
+
+LOG_VERSION = 1
+"""Format version of record logs written."""
+
+
+def pack_record(key: str, data: td.StrOrBytes | None) -> bytes:
+    """
+    Renders a length-prefixed binary record of
+    some search key and the data related to it.
+    Records without data are tombstones.
+    """
+
+    flags, rkey = 0, key.encode()
+
+    if data is None:
+        flags, data = RECORD_TOMBSTONE, b""
+    elif isinstance(data, str):
+        flags, data = RECORD_TEXT, data.encode()
+
+    return RECORD_HEADER.pack(flags, len(rkey), len(data)) + rkey + data
+
+
+def unpack_data(flags: int, data: bytes) -> td.StrOrBytes:
+    """
+    Restores the data of some binary record to
+    the type it was packed from.
+    """
+
+    if flags & RECORD_TEXT:
+        return data.decode()
+    return data
+
+
+def iter_records(buffer: bytes | bytearray | memoryview | mmap.mmap,
+                 offset: int = 0):
+    """
+    Walks the binary records held in `buffer`.
+    Yields the flags, key, data offset and data
+    length of each. Stops at the first truncated
+    record.
+    """
+
+    size = RECORD_HEADER.size
+    while offset + size <= len(buffer):
+        flags, klen, dlen = RECORD_HEADER.unpack_from(buffer, offset)
+
+        start = offset + size + klen
+        if start + dlen > len(buffer):
+            break
+
+        key = bytes(buffer[offset + size:start]).decode()
+        yield flags, key, start, dlen
+        offset = start + dlen
+
+
+SNAPSHOT_MAGIC = b"AMPS"
+"""Leading bytes of every snapshot file."""
+
+SNAPSHOT_HEADER = struct.Struct(">4sHxxQ")
+"""
+Header of a snapshot file. Holds the magic bytes,
+the format version and the number of index
+slots.
+"""
+
+SNAPSHOT_SLOT = struct.Struct(">QQ")
+"""
+Index slot of a snapshot file. Holds the key hash
+and the offset of its record. Empty slots have an
+offset of zero.
+"""
+
+SHARED_MAGIC = b"AMPH"
+"""Leading bytes of every shared memory table."""
+
+SHARED_HEADER = struct.Struct(">4sHxxII")
+"""
+Header of a shared memory table. Holds the magic
+bytes, the format version, the number of slots
+and the size of each slot.
+"""
+
+SHARED_SLOT = struct.Struct(">QQBxHI")
+"""
+Header of a slot in a shared memory table. Holds
+the slot version, the key hash, the record flags
+and the key and data lengths. The key and data
+follow. Slots never written have a version of
+zero. Odd versions are being written.
+"""
+
+DEFAULT_SHARED_SLOTS = 1024
+"""Default number of slots in a shared memory table."""
+
+DEFAULT_SHARED_SLOT_SIZE = 512
+"""
+Default size, in bytes, of each slot in a shared
+memory table. Larger entries are not stored.
+"""
+
+SHARED_PROBE_LIMIT = 8
+"""
+Number of slots probed for a key before some
+entry is evicted to make room.
+"""
+
+SHARED_READ_RETRIES = 10_000
+"""
+Number of times a slot being written is read
+again before it is taken to be empty.
+"""
+
+
+def snapshot_hash(key: str | bytes) -> int:
+    """
+    Stable 64 bit hash of some search key. Used to
+    place keys in a snapshot index.
+    """
+
+    if isinstance(key, str):
+        key = key.encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
+
+def write_snapshot(manager: pt.CacheManager,
+                   path: td.OptFilePath = None,
+                   *,
+                   keys: td.Optional[td.Sequence[str]] = None,
+                   serializer: td.Optional[pt.SupportsSerialize] = None):
+    """
+    Dumps the contents of some `CacheManager` into
+    an indexed snapshot file. Only `keys` are
+    dumped if given, otherwise the manager must
+    provide an `items` method.
+
+    Data is serialized with `json` unless some
+    other `serializer` is given.
+
+    The snapshot is written beside `path` and
+    moved into place once complete.
+    """
+
+    if keys is not None:
+        items = ((k, manager.find(k, MISSING)) for k in keys)
+    elif hasattr(manager, "items"):
+        items = manager.items()
+    else:
+        raise ValueError(f"{type(manager).__name__} cannot list its items; "
+                         "keys must be given.")
+
+    dumper: pt.SupportsSerialize = \
+        serializer or json  #type: ignore[assignment]
+
+    records = [(k, pack_record(k, loaders.dump(dumper, v))) for k, v in items
+               if v is not MISSING]
+
+    # Keep the index at most half full so
+    # probes stay short.
+    slots = 1
+    while slots < len(records) * 2:
+        slots <<= 1
+
+    index = bytearray(SNAPSHOT_SLOT.size * slots)
+    offset = SNAPSHOT_HEADER.size + len(index)
+
+    for key, record in records:
+        khash = snapshot_hash(key)
+        slot = khash % slots
+        while SNAPSHOT_SLOT.unpack_from(index, slot * SNAPSHOT_SLOT.size)[1]:
+            slot = (slot + 1) % slots
+
+        SNAPSHOT_SLOT.pack_into(index, slot * SNAPSHOT_SLOT.size, khash,
+                                offset)
+        offset += len(record)
+
+    path = str(get_cache_path(path))
+    temp_path = path + ".tmp"
+
+    with open(temp_path, "wb") as fd:
+        fd.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 1, slots))
+        fd.write(index)
+        for _, record in records:
+            fd.write(record)
+        fd.flush()
+        os.fsync(fd.fileno())
+
+    os.replace(temp_path, path)
+    return path
+
+
+def is_empty_result(data) -> bool:
+    """
+    Whether some result is `None` or an empty
+    collection. Default test for negative results.
+    """
+
+    if data is None:
+        return True
+    return isinstance(data, abc.Sized) and not len(data)
+
+
+class NegativeCache:
+    """
+    Holds negative results, such as empty
+    collections or 'not found' errors, in memory
+    for a limited time.
+    """
+
+    max_entries: int
+    """Maximum number of negative results held."""
+
+    ttl: float
+    """
+    Number of seconds a negative result is held.
+    """
+
+    def __init__(self, ttl: float, *, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: collections.OrderedDict[str, tuple] = \
+            collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def find(self, key: str):
+        """
+        Returns the result, or raises the error,
+        held for the given key. Returns `MISSING`
+        if nothing is held or it has expired.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return MISSING
+
+            expires_at, data, error = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+
+        # The same error is raised on every hit, so
+        # its traceback is dropped each time rather
+        # than grown onto.
+        if error is not None:
+            raise error.with_traceback(None)
+        return data
+
+    def save(self, key: str, data=None, *, error=None):
+        """
+        Holds some negative result, or error, for
+        the given key.
+        """
+
+        if error is not None:
+            error = error.with_traceback(None)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, data, error)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls sharing some key
+    so that only the first caller does the work.
+    Other callers wait on, and receive, the same
+    result or error.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[td.Any, _Flight] = dict()
+        self._futures: dict[td.Any, asyncio.Future] = dict()
+
+    def do(self, key: str, func: ft.Callable[..., td.GT], *args,
+           **kwds) -> td.GT:
+        """
+        Calls `func`, unless another thread is
+        already calling it for the same key.
+        """
+
+        with self._lock:
+            flight = self._flights.get(key, None)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            return flight.wait()  #type: ignore[union-attr]
+
+        try:
+            flight.result = func(*args, **kwds)  #type: ignore[union-attr]
+        except BaseException as error:
+            flight.error = error  #type: ignore[union-attr]
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()  #type: ignore[union-attr]
+
+        return flight.result  #type: ignore[union-attr]
+
+    async def ado(self, key: str, func: ft.Callable[..., td.Any], *args,
+                  **kwds):
+        """
+        Awaits `func`, unless another task on the
+        same event loop is already awaiting it for
+        the same key.
+        """
+
+        loop = asyncio.get_running_loop()
+        fkey = (loop, key)
+
+        with self._lock:
+            future = self._futures.get(fkey, None)
+            leader = future is None
+            if leader:
+                future = self._futures[fkey] = loop.create_future()
+
+        if not leader:
+            return await asyncio.shield(future)  #type: ignore[arg-type]
+
+        try:
+            result = await func(*args, **kwds)
+        except asyncio.CancelledError:
+            future.cancel()  #type: ignore[union-attr]
+            raise
+        except BaseException as error:
+            future.set_exception(error)  #type: ignore[union-attr]
+            # Mark the error as retrieved in case
+            # no other task was waiting.
+            future.exception()  #type: ignore[union-attr]
+            raise
+        else:
+            future.set_result(result)  #type: ignore[union-attr]
+        finally:
+            with self._lock:
+                del self._futures[fkey]
+
+        return result
+
+
+class _Flight:
+    """A call in progress for some key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: td.Optional[BaseException] = None
+        self.result: td.Any = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+ENTRY_TAG = "ampyr.entry"
+"""
+Leading item of an entry stored with an expiry.
+"""
+
+
+class CacheEntry(td.NamedTuple):
+    """
+    Cached data with a soft and a hard expiry.
+    Past the soft expiry the data is stale but
+    may still be served. Past the hard expiry it
+    must not be.
+    """
+
+    data: td.Any
+    soft_expires_at: float
+    hard_expires_at: td.Optional[float]
+
+    @property
+    def isexpired(self):
+        """Whether the hard expiry has passed."""
+
+        if self.hard_expires_at is None:
+            return False
+        return self.hard_expires_at <= time.time()
+
+    @property
+    def isstale(self):
+        """Whether the soft expiry has passed."""
+
+        return self.soft_expires_at <= time.time()
+
+
+def make_entry(data,
+               soft_ttl: float,
+               hard_ttl: td.Optional[float] = None) -> list:
+    """
+    Wraps some data with a soft, and optionally a
+    hard, expiry. The result is a plain list so
+    any serializer can store it.
+    """
+
+    now = time.time()
+    hard_expires_at = now + hard_ttl if hard_ttl is not None else None
+    return [ENTRY_TAG, data, now + soft_ttl, hard_expires_at]
+
+
+def read_entry(found) -> td.Optional[CacheEntry]:
+    """
+    Unwraps data saved by `make_entry`. Returns
+    `None` if the data was saved without an
+    expiry.
+    """
+
+    if not isinstance(found, (list, tuple)) or len(found) != 4:
+        return None
+    if found[0] != ENTRY_TAG:
+        return None
+    return CacheEntry(*found[1:])
+
+
+class RefreshPool:
+    """
+    Bounded pool of workers which refresh stale
+    cache entries in the background. Keys already
+    being refreshed, or past `max_pending`, are
+    not queued again.
+    """
+
+    max_pending: int
+    """
+    Maximum number of refreshes queued or running
+    at once.
+    """
+
+    max_workers: int
+    """Number of worker threads."""
+
+    def __init__(self,
+                 max_workers: int = DEFAULT_REFRESH_WORKERS,
+                 *,
+                 max_pending: int = DEFAULT_MAX_ENTRIES):
+        self.max_pending = max_pending
+        self.max_workers = max_workers
+
+        self._executor: td.Optional[futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def shutdown(self, wait: bool = True):
+        """Stops the worker threads, if started."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def submit(self, key: str, func: ft.Callable, *args) -> bool:
+        """
+        Calls `func` in a worker thread. Returns
+        whether the refresh was queued.
+        """
+
+        if not self._reserve(key):
+            return False
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="ampyr-refresh")
+            self._executor.submit(self._run, key, func, *args)
+
+        return True
+
+    def submit_task(self, key: str, func: ft.Callable, *args) -> bool:
+        """
+        Awaits `func` in a task on the running
+        event loop. Returns whether the refresh
+        was queued.
+        """
+
+        if not self._reserve(key):
+            return False
+
+        task = asyncio.get_running_loop().create_task(
+            self._arun(key, func, *args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return True
+
+    def _reserve(self, key: str) -> bool:
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(key)
+            return True
+
+    def _run(self, key: str, func: ft.Callable, *args):
+        # A failed refresh leaves the stale entry
+        # in place. The next caller past the soft
+        # expiry tries again.
+        try:
+            func(*args)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    async def _arun(self, key: str, func: ft.Callable, *args):
+        try:
+            await func(*args)
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+DEFAULT_REFRESH_POOL = RefreshPool()
+"""
+Pool used to refresh stale entries unless another
+is given to `cachemethod`.
+"""
+
+
+def cachemethod(func: td.Optional[ft.Callable[_PS, td.GT]] = None,
+                *,
+                digest: bool = False,
+                negative_ttl: td.Optional[float] = None,
+                negative_errors: tuple[type[BaseException],
+                                       ...] = (errors.AmpyrNotFoundError, ),
+                is_negative: ft.Callable[[td.Any], bool] = is_empty_result,
+                single_flight: bool = True,
+                soft_ttl: td.Optional[float] = None,
+                hard_ttl: td.Optional[float] = None,
+                refresh_pool: td.Optional[RefreshPool] = None):
     """
     Wraps the target method in such a way that
     it can cache its callouts. Callouts will only
     be cached if there is a `cache_mangager`
     available.
+
+    Coroutine methods are awaited, and cached
+    through `afind`/`asave` when their
+    `cache_manager` supports them.
+
+    May be used with or without arguments. If
+    `digest` is set, search keys are reduced to a
+    fixed size digest.
+
+    If `negative_ttl` is set, results passing
+    `is_negative` and any of `negative_errors`
+    raised are held in memory for that many
+    seconds instead of being cached by the
+    `cache_manager`.
+
+    Unless `single_flight` is unset, concurrent
+    misses on the same key are coalesced into a
+    single callout.
+
+    If `soft_ttl` is set, results are cached with
+    an expiry. Stale results are served at once
+    while `refresh_pool` fetches a new result in
+    the background. Only results past `hard_ttl`
+    make the caller wait.
+
+    Hits, misses and latencies of calls to the
+    wrapped method are counted by the
+    `cache_stats` attribute of the wrapper.
     """
 
+    if func is None:
+        return functools.partial(cachemethod,
+                                 digest=digest,
+                                 negative_ttl=negative_ttl,
+                                 negative_errors=negative_errors,
+                                 is_negative=is_negative,
+                                 single_flight=single_flight,
+                                 soft_ttl=soft_ttl,
+                                 hard_ttl=hard_ttl,
+                                 refresh_pool=refresh_pool)
+
+    method = _MethodCache(func,
+                          digest=digest,
+                          negative_ttl=negative_ttl,
+                          negative_errors=negative_errors,
+                          is_negative=is_negative,
+                          single_flight=single_flight,
+                          soft_ttl=soft_ttl,
+                          hard_ttl=hard_ttl,
+                          refresh_pool=refresh_pool)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def ainner(*args: _PS.args, **kwds: _PS.kwargs):
+            return await method.acall(args, kwds)
+
+        ainner.cache_stats = method.stats  #type: ignore[attr-defined]
+        return ainner
+
     @functools.wraps(func)
     def inner(*args: _PS.args, **kwds: _PS.kwargs):
-        signature = _parse_signature(func, args, kwds)
-        self, args = _parse_cache_args(*args)  #type: ignore[assignment]
+        return method.call(args, kwds)
 
-        if (data := self.cache_manager.find(signature)):
+    inner.cache_stats = method.stats  #type: ignore[attr-defined]
+    return inner
+
+
+class _MethodCache:
+    """
+    State shared by every call to some method
+    wrapped by `cachemethod`.
+    """
+
+    def __init__(self, func: ft.Callable, *, digest: bool,
+                 negative_ttl: td.Optional[float],
+                 negative_errors: tuple[type[BaseException], ...],
+                 is_negative: ft.Callable[[td.Any], bool], single_flight: bool,
+                 soft_ttl: td.Optional[float], hard_ttl: td.Optional[float],
+                 refresh_pool: td.Optional[RefreshPool]):
+
+        self.func = func
+        self.build_key = KeyBuilder(func, digest=digest)
+
+        self.negatives = NegativeCache(negative_ttl) if negative_ttl else None
+        self.negative_errors = negative_errors
+        self.is_negative = is_negative
+
+        self.flights = SingleFlight() if single_flight else None
+
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.refresh_pool = refresh_pool or DEFAULT_REFRESH_POOL
+
+        self.stats = stats.CacheStats()
+
+    def call(self, args: tuple, kwds: dict):
+        start = time.perf_counter_ns()
+        signature = self.build_key(args, kwds)
+        obj, args = _parse_cache_args(*args)
+
+        if self.negatives:
+            if (data := self.negatives.find(signature)) is not MISSING:
+                return self.record(start, data)
+
+        data = obj.cache_manager.find(signature, MISSING)
+        if data is not MISSING:
+            if self.soft_ttl is None or (entry := read_entry(data)) is None:
+                return self.record(start, data)
+
+            if not entry.isexpired:
+                if entry.isstale:
+                    self.refresh_pool.submit(signature, self.fetch_once, obj,
+                                             signature, args, kwds)
+                return self.record(start, entry.data)
+
+        try:
+            return self.fetch_once(obj, signature, args, kwds)
+        finally:
+            self.record(start)
+
+    async def acall(self, args: tuple, kwds: dict):
+        start = time.perf_counter_ns()
+        signature = self.build_key(args, kwds)
+        obj, args = _parse_cache_args(*args)
+
+        if self.negatives:
+            if (data := self.negatives.find(signature)) is not MISSING:
+                return self.record(start, data)
+
+        data = await _afind(obj.cache_manager, signature, MISSING)
+        if data is not MISSING:
+            if self.soft_ttl is None or (entry := read_entry(data)) is None:
+                return self.record(start, data)
+
+            if not entry.isexpired:
+                if entry.isstale:
+                    self.refresh_pool.submit_task(signature, self.afetch_once,
+                                                  obj, signature, args, kwds)
+                return self.record(start, entry.data)
+
+        try:
+            return await self.afetch_once(obj, signature, args, kwds)
+        finally:
+            self.record(start)
+
+    def record(self, start: int, data=MISSING):
+        """
+        Counts a call started at `start` in
+        `stats`. Calls given data are hits.
+        """
+
+        if self.stats.enabled:
+            hit = data is not MISSING
+            self.stats.record_find(hit, not hit,
+                                   time.perf_counter_ns() - start)
+        return data
+
+    def fetch_once(self, obj: pt.HasCacheHandler, signature: str, args: tuple,
+                   kwds: dict):
+        """
+        Fetches a result, coalescing with any
+        concurrent fetch of the same key.
+        """
+
+        if self.flights is None:
+            return self.fetch(obj, signature, args, kwds)
+        return self.flights.do(signature, self.fetch, obj, signature, args,
+                               kwds)
+
+    async def afetch_once(self, obj: pt.HasCacheHandler, signature: str,
+                          args: tuple, kwds: dict):
+        """
+        Awaits a result, coalescing with any
+        concurrent fetch of the same key.
+        """
+
+        if self.flights is None:
+            return await self.afetch(obj, signature, args, kwds)
+        return await self.flights.ado(signature, self.afetch, obj, signature,
+                                      args, kwds)
+
+    def fetch(self, obj: pt.HasCacheHandler, signature: str, args: tuple,
+              kwds: dict):
+        """
+        Calls the wrapped method and caches its
+        result.
+        """
+
+        try:
+            data = self.func(obj, *args, **kwds)
+        except self.negative_errors as error:
+            if self.negatives:
+                self.negatives.save(signature, error=error)
+            raise
+
+        if self.negatives and self.is_negative(data):
+            self.negatives.save(signature, data)
             return data
-        else:
-            data = func(self, *args, **kwds)  #type: ignore[arg-type]
-            return self.cache_manager.save(signature, data)
 
-    return inner
+        if self.soft_ttl is None:
+            return obj.cache_manager.save(signature, data)
 
+        entry = make_entry(data, self.soft_ttl, self.hard_ttl)
+        obj.cache_manager.save(signature, entry)
+        return data
 
-def _parse_cache_args(self, *args) -> tuple[pt.HasCacheHandler, tuple]:
-    return self, args
+    async def afetch(self, obj: pt.HasCacheHandler, signature: str,
+                     args: tuple, kwds: dict):
+        """
+        Awaits the wrapped method and caches its
+        result.
+        """
+
+        try:
+            data = await self.func(obj, *args, **kwds)
+        except self.negative_errors as error:
+            if self.negatives:
+                self.negatives.save(signature, error=error)
+            raise
+
+        if self.negatives and self.is_negative(data):
+            self.negatives.save(signature, data)
+            return data
 
+        if self.soft_ttl is None:
+            return await _asave(obj.cache_manager, signature, data)
 
-def _parse_signature(method: ft.Callable, args, kwds) -> str:
-    callargs = inspect.getcallargs(method, *args, **kwds)
+        entry = make_entry(data, self.soft_ttl, self.hard_ttl)
+        await _asave(obj.cache_manager, signature, entry)
+        return data
 
-    # Ensure signature is not unique to a parent
-    # instance.
-    if "self" in callargs:
-        callargs["self"] = type(callargs["self"])
 
-    return ", ".join(["{}: {}".format(k, v) for k, v in callargs.items()])
+async def _afind(manager: pt.CacheManager, key: str, default=None):
+    """
+    Finds some key, awaiting the manager if it
+    is an `AsyncCacheManager`.
+    """
+
+    if hasattr(manager, "afind"):
+        return await manager.afind(key, default)
+    return manager.find(key, default)
+
+
+async def _asave(manager: pt.CacheManager, key: str, data):
+    """
+    Saves some key, awaiting the manager if it
+    is an `AsyncCacheManager`.
+    """
+
+    if hasattr(manager, "asave"):
+        return await manager.asave(key, data)
+    return manager.save(key, data)
+
+
+def _parse_cache_args(self, *args) -> tuple[pt.HasCacheHandler, tuple]:
+    return self, args
@@ -17,11 +17,11 @@ class CacheManager(Protocol[td.GT]):
     """
 
     @abstractmethod
-    def find(self, key: str) -> None | td.GT:
+    def find(self, key: str, default: td.Any = None) -> td.Any | td.GT:
         """
         Attempt to retrieve data from the cache
-        assigned to the given key. Returns `None`
-        if it fails.
+        assigned to the given key. Returns
+        `default` if it fails.
         """
 
     @abstractmethod
@@ -31,6 +31,90 @@ class CacheManager(Protocol[td.GT]):
         assigning it to the given key.
         """
 
+    def find_many(self, keys: td.Iterable[str]) -> dict[str, td.GT]:
+        """
+        Attempt to retrieve data from the cache
+        for each of the given keys. Keys which
+        could not be found are left out.
+        """
+
+        found, missing = dict(), object()
+        for key in keys:
+            if (data := self.find(key, missing)) is not missing:
+                found[key] = data
+        return found
+
+    def save_many(self, mapping: dict[str, td.GT]) -> dict[str, td.GT]:
+        """
+        Attempt to insert each key and data pair
+        of the given mapping into the cache.
+        """
+
+        for key, data in mapping.items():
+            self.save(key, data)
+        return mapping
+
+
+class AsyncCacheManager(Protocol[td.GT]):
+    """
+    Brokers transactions of cached data without
+    blocking an event loop.
+    """
+
+    @abstractmethod
+    async def afind(self, key: str, default: td.Any = None) -> td.Any | td.GT:
+        """
+        Attempt to retrieve data from the cache
+        assigned to the given key. Returns
+        `default` if it fails.
+        """
+
+    @abstractmethod
+    async def asave(self, key: str, data: td.GT) -> td.GT:
+        """
+        Attempt to insert data into the cache,
+        assigning it to the given key.
+        """
+
+
+class EvictionPolicy(Protocol):
+    """
+    Decides which entries of some bounded cache
+    are kept, and which are evicted to make room.
+    """
+
+    def admit(self, key: str) -> bool:
+        """
+        Whether a new key is worth storing in a
+        full cache, at the cost of the current
+        victim.
+        """
+
+        return True
+
+    @abstractmethod
+    def touch(self, key: str) -> None:
+        """Records a hit on a stored key."""
+
+    @abstractmethod
+    def insert(self, key: str) -> None:
+        """Records a new key being stored."""
+
+    @abstractmethod
+    def remove(self, key: str) -> None:
+        """Forgets a key removed from the cache."""
+
+    @abstractmethod
+    def victim(self) -> str:
+        """Key which would be evicted next."""
+
+    @abstractmethod
+    def evict(self) -> str:
+        """
+        Forgets the key which would be evicted
+        next and returns it.
+        """
+
 
 class HasCacheHandler(Protocol):
     """
@@ -6,8 +6,8 @@ package.
 import enum
 from os import PathLike
 from pathlib import Path
-from typing import ClassVar, NewType, ParamSpec, TypedDict, TypeVar  # Keep these separate.
-from typing import Any, Optional, Sequence
+from typing import ClassVar, NamedTuple, NewType, ParamSpec, TypedDict, TypeVar  # Keep these separate.
+from typing import Any, Iterable, Optional, Sequence
 
 from httpx import Client as Session, Response
 
@@ -81,7 +81,12 @@ def oauth_flow_object_expired_token(oauth_flow_object: SimpleOAuth2Flow):
 @pytest.fixture(scope="module", params=[
     cache.MemoryCacheManager,
     cache.FileCacheManager,
-    cache.ShelfCacheManager])
+    cache.ShelfCacheManager,
+    cache.LogCacheManager,
+    cache.SQLiteCacheManager,
+    cache.TieredCacheManager,
+    cache.ShardedMemoryCacheManager,
+    cache.LockedFileCacheManager])
 def cache_manager_class(request):
     """
     Returns one of the different `CacheManager`
@@ -1,6 +1,11 @@
+import asyncio, concurrent.futures, functools, gc, json, multiprocessing, os
+import threading, time, traceback, weakref
+
 import pytest
 
-from ampyr import protocols as pt
+from ampyr import cache, errors, factories as ft, protocols as pt, \
+    typedefs as td
+from ampyr.cache import loaders, managers, remote, sketches, tools
 
 
 def test_cache_manager_can_init(cache_manager_object: pt.CacheManager):
@@ -28,3 +33,1169 @@ def test_cache_manager_can_broker_data(
     cache_manager_object.save(obj_key, cacheable_object)
     assert cache_manager_object.find(nil_key) is None
     assert cache_manager_object.find(obj_key) == cacheable_object
+
+
+def test_memory_cache_manager_evicts_least_recent():
+    """
+    Validates that a bounded `MemoryCacheManager`
+    evicts the least recently used entry and
+    keeps its data separate from other instances.
+    """
+
+    manager = cache.MemoryCacheManager(max_entries=2)
+    manager.save("a", 1)
+    manager.save("b", 2)
+    manager.find("a")
+    manager.save("c", 3)
+
+    assert manager.find("b") is None
+    assert manager.find("a") == 1
+    assert manager.find("c") == 3
+    assert cache.MemoryCacheManager().find("a") is None
+
+
+def test_shelf_cache_manager_persistent(tmp_path):
+    """
+    Validates that a persistent
+    `ShelfCacheManager` keeps its shelf open
+    until closed and is usable across threads.
+    """
+
+    path = str(tmp_path / "shelf")
+
+    with cache.ShelfCacheManager(data_location=path,
+                                 persistent=True,
+                                 backend="dbm.dumb") as manager:
+        with concurrent.futures.ThreadPoolExecutor(4) as pool:
+            list(pool.map(lambda i: manager.save(str(i), i), range(32)))
+
+        assert manager.find("null_key") is None
+        assert manager.find("31") == 31
+
+    assert cache.ShelfCacheManager(data_location=path,
+                                   backend="dbm.dumb").find("7") == 7
+
+
+def test_log_cache_manager_reopens_and_compacts(tmp_path):
+    """
+    Validates that a `LogCacheManager` holds many
+    records in one file, rebuilds its index when
+    reopened and keeps only live records after
+    compaction.
+    """
+
+    path = str(tmp_path / "log")
+
+    with cache.LogCacheManager(data_location=path) as manager:
+        for i in range(100):
+            manager.save(str(i % 10), i)
+
+    with cache.LogCacheManager(data_location=path) as manager:
+        assert manager.find("3") == 93
+        size = os.path.getsize(path)
+
+        manager.compact()
+        manager.save("10", [])
+        assert os.path.getsize(path) < size
+        assert manager.find("9") == 99
+        assert manager.find("10") == []
+
+    with cache.LogCacheManager(data_location=path) as manager:
+        assert manager.find("10") == []
+
+
+def test_log_cache_manager_refuses_foreign_files(tmp_path):
+    """
+    Validates that a `LogCacheManager` refuses to
+    open, and so truncate, files it did not
+    write.
+    """
+
+    path = str(tmp_path / ".cache")
+    cache.FileCacheManager(data_location=path).save("key", "data")
+    size = os.path.getsize(path)
+
+    with pytest.raises(ValueError):
+        cache.LogCacheManager(data_location=path)
+    assert os.path.getsize(path) == size
+
+
+def test_sqlite_cache_manager_batches_commits(tmp_path):
+    """
+    Validates that an `SQLiteCacheManager` only
+    exposes saves to other connections once their
+    batch is committed.
+    """
+
+    path = str(tmp_path / "cache.db")
+    writer = cache.SQLiteCacheManager(data_location=path, batch_size=3)
+    reader = cache.SQLiteCacheManager(data_location=path)
+
+    writer.save("a", 1)
+    writer.save("b", 2)
+    assert writer.find("a") == 1
+    assert reader.find("a") is None
+
+    writer.save("c", 3)
+    assert reader.find("a") == 1
+
+    with writer.transaction():
+        for i in range(10):
+            writer.save(str(i), i)
+        assert reader.find("9") is None
+    assert reader.find("9") == 9
+
+    writer.close()
+    reader.close()
+
+
+def test_snapshot_cache_manager_serves_dumped_data(tmp_path, cacheable_object):
+    """
+    Validates that data dumped from some
+    `CacheManager` can be found through a
+    `SnapshotCacheManager`.
+    """
+
+    manager = cache.MemoryCacheManager()
+    for i in range(50):
+        manager.save(f"key_{i}", i)
+    manager.save("object_key", cacheable_object)
+
+    path = cache.write_snapshot(manager, str(tmp_path / "snapshot"))
+
+    with cache.SnapshotCacheManager(data_location=path) as snapshot:
+        assert snapshot.find("null_key") is None
+        assert snapshot.find("key_49") == 49
+        assert snapshot.find("object_key") == cacheable_object
+        assert len(list(snapshot.items())) == 51
+
+
+@pytest.mark.parametrize("manager_factory", [
+    lambda path: cache.MemoryCacheManager(),
+    lambda path: cache.AsyncMemoryCacheManager(),
+    lambda path: cache.AsyncLogCacheManager(data_location=path),
+    lambda path: cache.AsyncSQLiteCacheManager(data_location=path)])
+def test_cachemethod_awaits_coroutines(tmp_path, manager_factory):
+    """
+    Validates that `cachemethod` caches the
+    results of coroutine methods with both
+    blocking and async `CacheManager` objects.
+    """
+
+    class Client:
+        cache_manager = manager_factory(str(tmp_path / "cache"))
+        calls = 0
+
+        @cache.cachemethod
+        async def fetch(self, name):
+            await asyncio.sleep(0)
+            type(self).calls += 1
+            return {"name": name}
+
+    async def main():
+        client = Client()
+        return await client.fetch("playlist"), await client.fetch("playlist")
+
+    first, second = asyncio.run(main())
+    assert first == second == {"name": "playlist"}
+    assert Client.calls == 1
+
+
+def test_tiered_cache_manager_promotes_hits(tmp_path):
+    """
+    Validates that a `TieredCacheManager` writes
+    through to both tiers and promotes hits from
+    the slower tier.
+    """
+
+    l2 = cache.LogCacheManager(data_location=str(tmp_path / "log"))
+    with cache.TieredCacheManager(l2, l1_max_entries=2) as manager:
+        for i in range(4):
+            manager.save(str(i), i)
+
+        assert manager.l1.find("0") is None
+        assert manager.find("0") == 0
+        assert manager.l1.find("0") == 0
+        assert l2.find("3") == 3
+
+
+def test_cache_manager_can_broker_many(
+    cache_manager_object: pt.CacheManager,
+    cacheable_object):
+    """
+    Validates that the given `CacheManager`
+    object is able to `save_many` and `find_many`
+    in a single batch.
+    """
+
+    mapping = {"object_key": cacheable_object, "other_key": [cacheable_object]}
+    cache_manager_object.save_many(mapping)
+
+    # A `FileCacheManager` only holds the last
+    # record written.
+    if isinstance(cache_manager_object, cache.FileCacheManager):
+        mapping.pop("object_key")
+
+    found = cache_manager_object.find_many(["null_key", *mapping])
+    assert found == mapping
+
+
+def test_cache_manager_invalidates_tags(cache_manager_object: pt.CacheManager):
+    """
+    Validates that the given `CacheManager`
+    object drops exactly the entries saved with
+    some tag.
+    """
+
+    manager = cache_manager_object
+    manager.save("a", 1, tags=["user:1"])
+    manager.save("keep", 0)
+    assert manager.invalidate_tag("user:1") == 1
+    assert manager.invalidate_tag("user:1") == 0
+    assert manager.find("a") is None
+
+    manager.save_many({"b": 2, "c": 3}, tags=["user:2", "endpoint:me"])
+    manager.invalidate_tag("endpoint:me")
+    assert manager.find_many(["b", "c"]) == {}
+    assert manager.invalidate_tag("user:2") == 0
+
+    manager.save("d", 4, tags=["user:3"])
+    manager.invalidate("d")
+    assert manager.find("d") is None
+    assert manager.invalidate_tag("user:3") == 0
+
+    # A `FileCacheManager` only holds the last
+    # record written.
+    if not isinstance(manager, cache.FileCacheManager):
+        assert manager.find("keep") == 0
+
+
+def test_sqlite_cache_manager_keeps_tags(tmp_path):
+    """
+    Validates that a `SQLiteCacheManager` keeps
+    tags in its database, so they outlive it.
+    """
+
+    path = tmp_path / "cache.db"
+    with cache.SQLiteCacheManager(data_location=path, batch_size=8) as manager:
+        manager.save_many({"a": 1, "b": 2}, tags=["user:1"])
+        manager.save("c", 3, tags=["user:1", "playlist:7"])
+        manager.save("d", 4, tags=["playlist:7"])
+
+    with cache.SQLiteCacheManager(data_location=path) as manager:
+        assert manager.invalidate_tag("user:1") == 3
+        assert manager.find_many(["a", "b", "c", "d"]) == {"d": 4}
+        assert manager.invalidate_tag("playlist:7") == 1
+        assert manager.find("d") is None
+
+
+@pytest.mark.parametrize("manager_class", [
+    cache.FileCacheManager, cache.ShelfCacheManager, cache.LogCacheManager,
+    cache.LockedFileCacheManager
+])
+def test_local_data_cache_managers_keep_tags(tmp_path, manager_class):
+    """
+    Validates that managers storing data on disc
+    save tags next to it, so they outlive the
+    manager.
+    """
+
+    path = str(tmp_path / "cache")
+    manager = manager_class(data_location=path)
+    manager.save("a", 1, tags=["user:1"])
+
+    other = manager_class(data_location=path)
+    assert other.invalidate_tag("user:1") == 1
+    assert other.find("a") is None
+    assert manager.invalidate_tag("user:1") == 0
+
+
+def test_local_data_cache_managers_tag_concurrently(tmp_path):
+    """
+    Validates that managers of the same data can
+    tag entries at once without losing links.
+    """
+
+    path, errors = str(tmp_path / "cache"), []
+
+    def work(worker):
+        try:
+            manager = cache.LockedFileCacheManager(data_location=path)
+            for n in range(50):
+                manager.save(f"{worker}-{n}", n, tags=[f"worker:{worker}"])
+            manager.close()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=work, args=(w, )) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    manager = cache.LockedFileCacheManager(data_location=path)
+    assert errors == []
+    assert all(len(manager.tags.keys(f"worker:{w}")) == 50 for w in range(4))
+    assert manager.invalidate_tag("worker:0") == 50
+    manager.close()
+
+
+def test_cache_managers_tag_only_stored_entries():
+    """
+    Validates that entries which are never stored
+    are not tagged, and that tags are shared by
+    managers attached to the same table.
+    """
+
+    manager = cache.MemoryCacheManager(max_bytes=8, serializer=json)
+    manager.save("big", "x" * 32, tags=["user:1"])
+    assert "user:1" not in manager.tags
+    assert manager.invalidate_tag("user:1") == 0
+
+    sharded = cache.ShardedMemoryCacheManager(max_bytes=8, serializer=json)
+    sharded.save("big", "x" * 32, tags=["user:1"])
+    assert "user:1" not in sharded.tags
+
+    snapshot = cache.SnapshotCacheManager(data_location="missing.snapshot")
+    assert snapshot.save("a", 1, tags=["user:1"]) == 1
+    assert snapshot.invalidate_tag("user:1") == 0
+
+    with cache.SharedMemoryCacheManager(slots=4, slot_size=64) as table:
+        try:
+            table.save("a", 1, tags=["user:1"])
+            with cache.SharedMemoryCacheManager(table.name) as other:
+                assert other.invalidate_tag("user:1") == 1
+            assert table.find("a") is None
+        finally:
+            table.unlink()
+
+
+def test_cache_manager_removes_through_delete():
+    """
+    Validates that managers defining `delete` can
+    drop entries without overriding `_remove`.
+    """
+
+    class DictCacheManager(managers.SimpleCacheManager):
+
+        def __init__(self):
+            super().__init__()
+            self.stored = dict()
+
+        def find(self, key, default=None):
+            return self.stored.get(key, default)
+
+        @tools.record_tags
+        def save(self, key, data):
+            self.stored[key] = data
+            return data
+
+        def delete(self, key):
+            self.stored.pop(key, None)
+
+    manager = DictCacheManager()
+    manager.save("a", 1, tags=["user:1"])
+    assert manager.invalidate_tag("user:1") == 1
+    assert manager.find("a") is None
+
+
+def test_key_builder_is_canonical():
+    """
+    Validates that `tools.KeyBuilder` renders the
+    same key however the arguments of a call are
+    given.
+    """
+
+    from ampyr.cache.tools import KeyBuilder
+
+    class Client:
+
+        def fetch(self, name, params=None, *, limit=10):
+            ...
+
+    build_key = KeyBuilder(Client.fetch)
+    client = Client()
+
+    key = build_key((client, "a", {"x": 1, "y": [2]}), {})
+    assert key == build_key((client, ), {"params": {"y": [2], "x": 1},
+                                         "name": "a",
+                                         "limit": 10})
+    assert key != build_key((client, "b"), {})
+    assert key == build_key((Client(), "a", {"y": [2], "x": 1}), {})
+
+    build_digest = KeyBuilder(Client.fetch, digest=True)
+    assert len(build_digest((client, "a" * 1000), {})) == \
+        len(build_digest((client, "b"), {}))
+
+    # Classes of the same name in other modules
+    # never share keys.
+    Other = type("Client", (), {"__module__": "other"})
+    Other.__qualname__ = Client.__qualname__
+    assert build_key((client, Client), {}) != build_key((client, Other), {})
+
+    def fetch(self, name, params=None, *, limit=10):
+        ...
+
+    fetch.__module__, fetch.__qualname__ = "other", Client.fetch.__qualname__
+    assert key != KeyBuilder(fetch)((client, "a", {"x": 1, "y": [2]}), {})
+
+
+@pytest.mark.parametrize("empty_object", [[], 0, "", {}, None])
+def test_cachemethod_caches_falsy_results(empty_object):
+    """
+    Validates that `cachemethod` treats falsy
+    results as cache hits.
+    """
+
+    class Client:
+        cache_manager = cache.MemoryCacheManager()
+        calls = 0
+
+        @cache.cachemethod
+        def fetch(self, name):
+            type(self).calls += 1
+            return empty_object
+
+    client = Client()
+    assert client.fetch("playlist") == empty_object
+    assert client.fetch("playlist") == empty_object
+    assert Client.calls == 1
+    assert Client.cache_manager.find("null_key", cache.MISSING) \
+        is cache.MISSING
+
+
+def test_cachemethod_negative_results_expire():
+    """
+    Validates that negative results and errors
+    are only held for `negative_ttl` seconds.
+    """
+
+    class Client:
+        cache_manager = cache.MemoryCacheManager()
+        calls = 0
+
+        @cache.cachemethod(negative_ttl=0.05)
+        def fetch(self, name):
+            type(self).calls += 1
+            if name == "missing":
+                raise errors.AmpyrNotFoundError("no such playlist.")
+            return []
+
+    client, depths = Client(), []
+    for _ in range(3):
+        assert client.fetch("empty") == []
+        with pytest.raises(errors.AmpyrNotFoundError) as caught:
+            client.fetch("missing")
+        depths.append(len(traceback.extract_tb(caught.value.__traceback__)))
+    assert Client.calls == 2
+
+    # Held errors do not carry the traceback of
+    # earlier hits.
+    assert depths[1] == depths[2]
+
+    time.sleep(0.1)
+    client.fetch("empty")
+    assert Client.calls == 3
+
+
+def test_cachemethod_coalesces_concurrent_misses():
+    """
+    Validates that concurrent misses on the same
+    key run the wrapped method once and share
+    its result or error.
+    """
+
+    class Client:
+        cache_manager = cache.MemoryCacheManager()
+        calls = 0
+
+        @cache.cachemethod
+        def fetch(self, name):
+            if name != "broken":
+                type(self).calls += 1
+            time.sleep(0.05)
+            if name == "broken":
+                raise ValueError(name)
+            return {"name": name}
+
+    client = Client()
+    with concurrent.futures.ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(client.fetch, ["playlist"] * 8))
+        errors_ = [pool.submit(client.fetch, "broken") for _ in range(8)]
+
+    assert results == [{"name": "playlist"}] * 8
+    assert all(isinstance(f.exception(), ValueError) for f in errors_)
+    assert Client.calls == 1
+
+
+def test_cachemethod_coalesces_concurrent_tasks():
+    """
+    Validates that concurrent misses on the same
+    key from `asyncio` tasks await the wrapped
+    method once.
+    """
+
+    class Client:
+        cache_manager = cache.AsyncMemoryCacheManager()
+        calls = 0
+
+        @cache.cachemethod
+        async def fetch(self, name):
+            type(self).calls += 1
+            await asyncio.sleep(0.05)
+            return {"name": name}
+
+    async def main():
+        client = Client()
+        return await asyncio.gather(*[client.fetch("a") for _ in range(8)])
+
+    assert asyncio.run(main()) == [{"name": "a"}] * 8
+    assert Client.calls == 1
+
+
+def test_cachemethod_serves_stale_while_revalidating():
+    """
+    Validates that stale results are served while
+    being refreshed in the background, and that
+    results past their hard expiry are fetched
+    again.
+    """
+
+    pool = cache.RefreshPool(1)
+
+    class Client:
+        cache_manager = cache.MemoryCacheManager()
+        calls = 0
+
+        @cache.cachemethod(soft_ttl=0.05, hard_ttl=0.3, refresh_pool=pool)
+        def fetch(self, name):
+            type(self).calls += 1
+            return Client.calls
+
+    client = Client()
+    assert client.fetch("a") == 1
+    assert client.fetch("a") == 1
+
+    time.sleep(0.1)
+    assert client.fetch("a") == 1
+    pool.shutdown()
+    assert client.fetch("a") == 2
+
+    time.sleep(0.4)
+    assert client.fetch("a") == 3
+
+
+@pytest.mark.parametrize("serializer", [
+    loaders.BinaryLoader(),
+    loaders.BinaryLoader(compression="zlib", threshold=0),
+    loaders.PickleLoader(compression="lzma", threshold=0)])
+def test_tagged_loaders_round_trip(tmp_path, serializer, cacheable_object):
+    """
+    Validates that data dumped by a
+    `TaggedLoader` is loaded back by any other,
+    and by a `FileCacheManager`.
+    """
+
+    dump = loaders.dump(serializer, cacheable_object)
+    assert loaders.istagged(dump)
+    assert loaders.load(loaders.BinaryLoader(), dump) == cacheable_object
+
+    manager = cache.FileCacheManager(data_location=str(tmp_path / "cache"),
+                                     serializer=serializer)
+    manager.save("object_key", cacheable_object)
+    assert manager.find("object_key") == cacheable_object
+
+
+def test_binary_loader_is_compact():
+    """
+    Validates that the compressed binary format
+    is smaller than `json` for repetitive data.
+    """
+
+    data = [{"id": i, "name": "track", "explicit": False} for i in range(200)]
+    dump = loaders.dump(loaders.BinaryLoader(compression="zlib"), data)
+
+    assert len(dump) < len(json.dumps(data)) // 4
+    assert loaders.load(json, dump, detect=True) == data
+
+    # Raw bytes which look tagged are passed
+    # through untouched.
+    raw = loaders.HEADER_MAGIC + bytes([loaders.FORMAT_BINARY, 0]) + b"junk"
+    manager = cache.MemoryCacheManager()
+    manager.save("raw", raw)
+    assert manager.find("raw") == raw
+
+
+def test_memory_cache_manager_object_modes():
+    """
+    Validates that each `ObjectMode` stores data
+    without serializing it and returns it as
+    described.
+    """
+
+    data = {"name": "playlist", "tracks": [1, 2]}
+
+    reference = cache.MemoryCacheManager(object_mode="reference")
+    reference.save("a", data)
+    assert reference.find("a") is data
+
+    copied = cache.MemoryCacheManager(object_mode=cache.ObjectMode.COPY)
+    copied.save("a", data)
+    assert copied.find("a") == data and copied.find("a") is not data
+    copied.find("a")["name"] = "changed"
+    assert copied.find("a")["name"] == "playlist"
+
+    frozen = cache.MemoryCacheManager(object_mode="frozen")
+    frozen.save("a", data)
+    assert frozen.find("a")["tracks"] == (1, 2)
+    with pytest.raises(TypeError):
+        frozen.find("a")["name"] = "changed"
+
+
+def test_cache_manager_records_stats():
+    """
+    Validates that managers and `cachemethod`
+    count hits, misses, saves and evictions.
+    """
+
+    manager = cache.MemoryCacheManager(max_entries=1, serializer=json)
+    manager.save("a", [1])
+    manager.save("b", [2])
+    assert manager.find("a") is None
+    assert manager.find("b") == [2]
+
+    snapshot = manager.stats.snapshot()
+    assert (snapshot["hits"], snapshot["misses"]) == (1, 1)
+    assert (snapshot["saves"], snapshot["evictions"]) == (2, 1)
+    assert snapshot["bytes_saved"] == 6
+    assert snapshot["find_latency"]["count"] == 2
+
+    manager.stats.reset()
+    assert manager.stats.hits == manager.stats.saves == 0
+
+    # Objects stored as they are still count
+    # towards the bytes saved.
+    passed = cache.MemoryCacheManager()
+    passed.save("a", [1])
+    assert passed.stats.bytes_saved > 0
+
+    class Spam:
+        cache_manager = cache.MemoryCacheManager()
+
+        @cache.cachemethod
+        def eggs(self, value):
+            return value
+
+    spam = Spam()
+    spam.eggs(1), spam.eggs(1), spam.eggs(2)
+    stats = Spam.eggs.cache_stats
+    assert (stats.hits, stats.misses) == (1, 2)
+    assert stats.hit_ratio == pytest.approx(1 / 3)
+
+
+def test_sharded_memory_cache_manager_namespaces():
+    """
+    Validates that a sharded manager keeps
+    namespaces apart and stays consistent under
+    concurrent writers.
+    """
+
+    manager = cache.ShardedMemoryCacheManager(shards=4, max_entries=None)
+    users = manager.namespace("users")
+    users.save("a", 1)
+    manager.save("a", 2)
+
+    assert users.find("a") == 1 and manager.find("a") == 2
+    assert dict(users.items()) == {"a": 1}
+
+    def write(start):
+        users.save_many({str(i): i for i in range(start, start + 250)})
+
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        list(pool.map(write, range(0, 1000, 250)))
+
+    assert len(dict(users.items())) == 1001
+    assert users.find_many(["a", "999", "nope"]) == {"a": 1, "999": 999}
+
+    users.clear()
+    assert users.find("a") is None and manager.find("a") == 2
+
+    bounded = cache.ShardedMemoryCacheManager(shards=2, max_entries=4)
+    bounded.save_many({str(i): i for i in range(10)})
+    assert len(dict(bounded.items())) <= 4
+    assert bounded.stats.evictions >= 6
+
+
+def _save_from_worker(path, start):
+    with cache.LockedFileCacheManager(data_location=path) as manager:
+        for i in range(start, start + 25):
+            manager.save(str(i), i)
+
+
+def test_locked_file_cache_manager_shares_between_processes(tmp_path):
+    """
+    Validates that processes writing to the same
+    locked file keep each other's records, and
+    that readers see writes from other processes.
+    """
+
+    path = tmp_path / "shared.cache"
+    reader = cache.LockedFileCacheManager(data_location=path)
+    assert reader.find("0") is None
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_save_from_worker, args=(path, start))
+        for start in range(0, 100, 25)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    assert reader.find_many(str(i) for i in range(100)) \
+        == {str(i): i for i in range(100)}
+    assert not list(tmp_path.glob("*.tmp"))
+    reader.close()
+
+
+def _save_to_table(name):
+    with cache.SharedMemoryCacheManager(name) as manager:
+        manager.save("token", {"access": "d3adb33f"})
+
+
+def test_shared_memory_cache_manager_attaches(cacheable_object):
+    """
+    Validates that processes attached to the
+    same shared memory table see each other's
+    entries.
+    """
+
+    with cache.SharedMemoryCacheManager(slots=16, slot_size=128) as manager:
+        try:
+            manager.save("object_key", cacheable_object)
+            assert manager.find("object_key") == cacheable_object
+
+            # Its lock file is kept where no other
+            # user can reach it.
+            directory = os.path.dirname(manager._lock_fd.name)
+            assert not os.stat(directory).st_mode & 0o077
+
+            context = multiprocessing.get_context("fork")
+            worker = context.Process(target=_save_to_table,
+                                     args=(manager.name,))
+            worker.start()
+            worker.join()
+            assert worker.exitcode == 0
+            assert manager.find("token") == {"access": "d3adb33f"}
+
+            manager.save("object_key", "x" * 256)
+            assert manager.find("object_key") is None
+
+            manager.save_many({str(i): i for i in range(32)})
+            assert manager.stats.evictions > 0
+            assert len(dict(manager.items())) <= 16
+        finally:
+            manager.unlink()
+
+
+def test_shared_memory_cache_manager_survives_torn_slots():
+    """
+    Validates that a slot left mid-write by a dead
+    writer reads as a miss and is written over.
+    """
+
+    with cache.SharedMemoryCacheManager(slots=4, slot_size=64) as manager:
+        try:
+            manager.save("key", "value")
+            slot = tools.snapshot_hash(b"key") % manager.slots
+            offset = tools.SHARED_HEADER.size + slot * manager.slot_size
+            manager._buffer[offset + 7] |= 1
+
+            assert manager.find("key") is None
+            manager.save("key", "other")
+            assert manager.find("key") == "other"
+        finally:
+            manager.unlink()
+
+
+@pytest.mark.parametrize("unix_socket", [False, True])
+def test_remote_cache_manager_talks_to_server(tmp_path, unix_socket,
+                                              cacheable_object):
+    """
+    Validates that a `RemoteCacheManager` brokers
+    data through a `CacheServer` and reports the
+    state of the server.
+    """
+
+    address = str(tmp_path / "cache.sock") if unix_socket \
+        else ("127.0.0.1", 0)
+    server = cache.CacheServer(address=address)
+    server.serve_in_thread()
+
+    with cache.RemoteCacheManager(server.address, pool_size=2) as manager:
+        assert manager.ping() == td.ReturnState.SUCCESS
+        assert manager.find("object_key") is None
+
+        manager.save("object_key", cacheable_object)
+        manager.save_many({"a": 1, "b": [2]})
+        assert manager.find("object_key") == cacheable_object
+        assert manager.find_many(["a", "b", "c"]) == {"a": 1, "b": [2]}
+
+        # Tags are kept by the server, so any
+        # client may invalidate them.
+        manager.save("c", 3, tags=["user:1"])
+        with cache.RemoteCacheManager(server.address) as other:
+            assert other.invalidate_tag("user:1") == 1
+        assert manager.find("c") is None
+
+        frames = [remote.pack_frame(remote.OP_PING)] * 3
+        assert [c for c, _ in manager.pipeline(frames)] \
+            == [remote.STATUS_OK] * 3
+
+        # Failed requests are answered, and leave
+        # the connection usable.
+        frames = [
+            remote.pack_frame(remote.OP_TAG,
+                              [tools.pack_record("c", "{bad")]),
+            remote.pack_frame(remote.OP_PING)
+        ]
+        assert [c for c, _ in manager.pipeline(frames)] \
+            == [remote.STATUS_ERROR, remote.STATUS_OK]
+
+        server.close()
+        manager.detach()
+        time.sleep(0.05)
+        assert manager.ping() == td.ReturnState.FAILURE
+
+
+def test_remote_cache_manager_raises_on_errors():
+    """
+    Validates that writes the server refuses raise
+    `ConnectionError` rather than pass silently.
+    """
+
+    class RefusingCacheServer(cache.CacheServer):
+
+        def dispatch(self, code, body):
+            if code == remote.OP_PING:
+                return super().dispatch(code, body)
+            return remote.pack_frame(remote.STATUS_ERROR)
+
+    server = RefusingCacheServer(address=("127.0.0.1", 0))
+    server.serve_in_thread()
+
+    with cache.RemoteCacheManager(server.address) as manager:
+        with pytest.raises(ConnectionError):
+            manager.save("key", 1)
+        with pytest.raises(ConnectionError):
+            manager.save_many({"a": 1})
+        with pytest.raises(ConnectionError):
+            manager.invalidate("key")
+
+    server.close()
+
+
+def test_hash_ring_cache_manager_spreads_keys():
+    """
+    Validates that a hash ring moves few keys when
+    a node leaves, and reads from replicas when a
+    node fails its `ping`.
+    """
+
+    class FlakyCacheManager(cache.MemoryCacheManager):
+        state = td.ReturnState.SUCCESS
+
+        def ping(self):
+            return self.state
+
+    nodes = {f"n{i}": FlakyCacheManager() for i in range(4)}
+    ring = ft.generic_make(cache.HashRingCacheManager,
+                           gt_factory=functools.partial(
+                               ft.basic_constructor_ft,
+                               nodes=nodes,
+                               replicas=2))
+
+    keys = [f"key-{i}" for i in range(400)]
+    before = {k: ring.locate(k)[0] for k in keys}
+    ring.save_many({k: k for k in keys})
+    assert all(len(dict(n.items())) < 400 for n in nodes.values())
+
+    nodes["n0"].state = td.ReturnState.FAILURE
+    ring.health_interval = 0.0
+    assert ring.find_many(keys) == {k: k for k in keys}
+    assert ring.find("key-1") == "key-1"
+
+    ring.remove_node("n0")
+    moved = [k for k in keys if ring.locate(k)[0] != before[k]]
+    assert moved and all(before[k] == "n0" for k in moved)
+    assert not ring.healthy("n0")
+
+
+def test_hash_ring_cache_manager_survives_node_removal():
+    """
+    Validates that lookups racing the removal of
+    a node never fail.
+    """
+
+    ring = cache.HashRingCacheManager([cache.MemoryCacheManager()] * 4,
+                                      replicas=2)
+    keys = [f"key-{i}" for i in range(50)]
+    running = True
+
+    def churn():
+        while running:
+            ring.add_node("node-0", ring.remove_node("node-0"))
+
+    worker = threading.Thread(target=churn)
+    worker.start()
+    try:
+        for _ in range(200):
+            ring.save_many({k: k for k in keys})
+            ring.find_many(keys)
+            ring.find("key-1")
+            ring.invalidate("key-2")
+    finally:
+        running = False
+        worker.join()
+
+
+def test_write_behind_cache_manager_groups_commits(tmp_path):
+    """
+    Validates that a write-behind manager serves
+    buffered saves and writes them out in batches
+    with one sync each.
+    """
+
+    class CountingLogCacheManager(cache.LogCacheManager):
+        syncs = 0
+
+        def sync(self):
+            type(self).syncs += 1
+            super().sync()
+
+    backend = CountingLogCacheManager(data_location=tmp_path / "log.cache")
+    manager = cache.WriteBehindCacheManager(backend,
+                                            max_pending=50,
+                                            flush_interval=60.0)
+
+    manager.save_many({str(i): i for i in range(10)})
+    assert manager.find("3") == 3 and backend.find("3") is None
+    assert manager.find_many(["3", "nope"]) == {"3": 3}
+
+    manager.save_many({str(i): i for i in range(10, 60)})
+    for _ in range(100):
+        if CountingLogCacheManager.syncs:
+            break
+        time.sleep(0.01)
+    assert backend.find("59") == 59
+    assert CountingLogCacheManager.syncs == 1
+
+    manager.save("last", [1])
+    manager.close()
+    reopened = cache.LogCacheManager(data_location=tmp_path / "log.cache")
+    assert reopened.find("last") == [1] and reopened.find("0") == 0
+    assert CountingLogCacheManager.syncs == 2
+    reopened.close()
+
+
+def test_write_behind_cache_managers_are_collected():
+    """
+    Validates that write-behind managers dropped
+    without being closed still write out their
+    buffer, and are then collected along with
+    their threads.
+    """
+
+    backend = cache.MemoryCacheManager()
+    refs = []
+    for i in range(20):
+        manager = cache.WriteBehindCacheManager(backend, flush_interval=0.01)
+        manager.save(str(i), i)
+        refs.append(weakref.ref(manager))
+    del manager
+
+    for _ in range(200):
+        gc.collect()
+        if not any(r() for r in refs):
+            break
+        time.sleep(0.01)
+
+    assert not any(r() for r in refs)
+    assert backend.find_many(map(str, range(20))) == {
+        str(i): i
+        for i in range(20)
+    }
+    assert not [
+        t for t in threading.enumerate() if t.name == "ampyr-write-behind"
+    ]
+
+
+@pytest.mark.parametrize("policy", ["lru", "lfu", "arc", "tinylfu"])
+def test_memory_cache_manager_eviction_policies(policy):
+    """
+    Validates that each eviction policy keeps the
+    manager within bounds and keeps a hot key
+    through a scan of cold keys.
+    """
+
+    manager = cache.MemoryCacheManager(max_entries=8, policy=policy)
+    for _ in range(4):
+        manager.save("hot", 1)
+        manager.find("hot")
+
+    for i in range(32):
+        manager.save(f"cold-{i}", i)
+        manager.find("hot")
+
+    assert len(manager.stored_data) <= 8
+    assert manager.find("hot") == 1
+
+    # A new key is never evicted to make room
+    # for itself.
+    manager = cache.MemoryCacheManager(max_entries=2, policy=policy)
+    manager.save_many({"a": 1, "b": 2})
+    manager.find_many(["a", "b"])
+    for _ in range(8):
+        manager.save("c", 3)
+    assert manager.find("c") == 3 and len(manager.stored_data) == 2
+
+
+def test_replay_prefers_frequency_on_scans():
+    """
+    Validates that `replay` reports hit ratios
+    for each policy, and that frequency aware
+    policies beat LRU when scans interleave with
+    a hot working set.
+    """
+
+    trace = [f"hot-{j}" for _ in range(3) for j in range(5)]
+    for i in range(200):
+        trace.extend(f"hot-{j}" for j in range(5))
+        trace.extend(f"scan-{i}-{j}" for j in range(10))
+
+    ratios = cache.replay(trace, capacity=10)
+    assert set(ratios) == {"lru", "lfu", "arc", "tinylfu"}
+    assert all(ratios["lru"] < ratios[p] for p in ("lfu", "arc", "tinylfu"))
+
+    ratios = cache.replay(["a", "b", "a", "b"] + ["c"] * 5, capacity=2)
+    assert ratios["lfu"] == ratios["arc"] == ratios["lru"]
+
+
+def test_memory_cache_managers_keep_byte_budgets():
+    """
+    Validates that memory managers track the size
+    of their entries and evict until they fit
+    their byte budgets.
+    """
+
+    manager = cache.MemoryCacheManager(max_bytes=100, serializer=json)
+    manager.save("a", "x" * 40)
+    manager.save("b", "y" * 40)
+    assert manager.usage == 84
+
+    manager.save("c", "z" * 40)
+    assert manager.find("a") is None and manager.usage == 84
+    manager.save("d", "w" * 200)
+    assert manager.find("d") is None and manager.usage == 84
+    assert manager.stats.evictions == 1
+
+    sharded = cache.ShardedMemoryCacheManager(shards=4, max_bytes=1000)
+    tokens = sharded.namespace("tokens", max_bytes=100)
+    playlists = sharded.namespace("playlists")
+
+    for i in range(10):
+        tokens.save(f"t{i}", "t" * 30)
+        playlists.save(f"p{i}", "p" * 150)
+
+    assert tokens.usage <= 100 and len(dict(tokens.items())) == 3
+    assert sharded.budget.usage <= 1000
+    assert sharded.budget.usage == tokens.usage + playlists.usage
+
+    playlists.clear()
+    assert playlists.usage == 0 and sharded.budget.usage == tokens.usage
+
+    # Budgets evict the least recently used
+    # entries, whichever shard holds them.
+    recent = cache.ShardedMemoryCacheManager(shards=4, max_bytes=30)
+    for key in ("k0", "k1", "k2"):
+        recent.save(key, "x" * 10)
+    recent.find("k0")
+    recent.save("k3", "x" * 10)
+    assert sorted(dict(recent.items())) == ["k0", "k2", "k3"]
+
+    # Recency is only kept for budgets with a
+    # limit, so unbounded caches never share a
+    # lock across shards.
+    unbounded = cache.ShardedMemoryCacheManager(shards=4)
+    unbounded._order_lock = None
+    unbounded.save_many({f"k{i}": "x" * 10 for i in range(4)})
+    assert len(unbounded.find_many(f"k{i}" for i in range(4))) == 4
+    unbounded.invalidate("k0")
+    unbounded.clear()
+    assert not dict(unbounded.items())
+
+    # A namespace given a budget later evicts
+    # the entries it already held first.
+    unbounded = cache.ShardedMemoryCacheManager(shards=4)
+    names = unbounded.namespace("names")
+    names.save_many({f"k{i}": "x" * 10 for i in range(3)})
+    names = unbounded.namespace("names", max_bytes=30)
+    names.save("k3", "x" * 10)
+    assert len(dict(names.items())) == 3 and names.find("k3")
+
+
+@pytest.mark.parametrize("manager_class", [
+    cache.FileCacheManager,
+    cache.ShelfCacheManager,
+    cache.SQLiteCacheManager])
+def test_disc_cache_managers_filter_misses(tmp_path, manager_class,
+                                           monkeypatch):
+    """
+    Validates that disc managers keeping a Bloom
+    filter answer definite misses without
+    touching the disc, and reuse a saved filter.
+    """
+
+    path = tmp_path / "bloom.cache"
+    manager = manager_class(data_location=path,
+                            use_bloom=True,
+                            persist_bloom=True)
+    manager.save("known", [1])
+    assert manager.find("known") == [1]
+    if hasattr(manager, "close"):
+        manager.close()
+    else:
+        manager.sync()
+
+    reopened = manager_class(data_location=path,
+                             use_bloom=True,
+                             persist_bloom=True)
+    assert "known" in reopened.bloom
+
+    def forbidden(*args, **kwds):
+        raise AssertionError("disc touched on a definite miss.")
+
+    assert "unknown" not in reopened.bloom
+    monkeypatch.setattr(os.path, "exists", forbidden)
+    monkeypatch.setattr(os.path, "isfile", forbidden)
+    assert reopened.find("unknown") is None
+    assert reopened.find_many(["unknown"]) == {}
+    monkeypatch.undo()
+
+    assert reopened.find("known") == [1]
+
+
+def test_bloom_filter_round_trips():
+    """
+    Validates that a Bloom filter never forgets a
+    key and keeps close to its error rate.
+    """
+
+    bloom = sketches.BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"key-{i}")
+
+    loaded = sketches.BloomFilter.loads(bloom.dumps())
+    assert all(f"key-{i}" in loaded for i in range(1000))
+    assert sum(f"other-{i}" in loaded for i in range(10000)) < 300